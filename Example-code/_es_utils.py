@@ -0,0 +1,60 @@
+from elasticsearch import Elasticsearch
+
+# (host, port, scheme) 별로 생성된 클라이언트 캐시
+_ES_CLIENT: dict = {}
+
+# 조회 전용 검색에 넘기는 preference 값
+# 같은 문자열을 쓰면 매번 같은 샤드 복제본으로 라우팅되어, 그 노드의 페이지 캐시를 계속 재사용함
+SEARCH_PREFERENCE = "fms-analytics"
+
+def get_es(host='10.20.2.21', port=59200, scheme='http'):
+    """
+    (host, port, scheme) 별로 Elasticsearch 클라이언트를 한 번만 생성해서 재사용합니다.
+    호출마다 새 클라이언트를 만들면 커넥션 풀/keep-alive 연결이 매번 새로 만들어지므로,
+    같은 스크립트 안에서는 이 함수로 받은 클라이언트를 공유합니다.
+    """
+    key = (host, port, scheme)
+    es = _ES_CLIENT.get(key)
+    if es is None:
+        es = Elasticsearch(
+            [{'host': host, 'port': port, 'scheme': scheme}],
+            http_compress=True,   # cat/indices 같은 텍스트 응답은 압축률이 높음
+            request_timeout=30,
+            maxsize=25
+        )
+        _ES_CLIENT[key] = es
+    return es
+
+def cat_indices(es, pattern="*"):
+    """
+    cat.indices(format='json', bytes='b')로 pattern에 해당하는 인덱스들을 인덱스명 순으로 조회해서
+    {"index": str, "store_size": int(bytes) 또는 None, "docs_count": int} dict 목록으로 반환합니다.
+    JSON 응답의 docs.count/store.size는 문자열이라 여기서 한 번만 int로 변환합니다.
+    """
+    cat_response = es.cat.indices(index=pattern, h="index,store.size,docs.count", s="index", format="json", bytes="b")
+    if not cat_response:
+        return []
+
+    results = []
+    for row in cat_response:
+        # 닫힌 인덱스 등은 docs.count/store.size가 비어 있음
+        try:
+            docs_count = int(row["docs.count"])
+        except (TypeError, ValueError):
+            docs_count = 0
+        try:
+            store_size = int(row["store.size"])
+        except (TypeError, ValueError):
+            store_size = None
+        results.append({
+            "index": row["index"],
+            "store_size": store_size,
+            "docs_count": docs_count
+        })
+    return results
+
+def human_size(n):
+    """cat.indices(bytes='b')로 받은 바이트 수를 MB 문자열로 변환 (예: 43305779 -> '41.3mb')"""
+    if n is None:
+        return "-"
+    return f"{n / 1048576:.1f}mb"
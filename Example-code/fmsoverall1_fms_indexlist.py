@@ -1,6 +1,10 @@
 import re
 from datetime import datetime
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
+
+# 날짜 추출(YYYY.MM.DD) 정규식 (모듈 로드 시 한 번만 컴파일)
+#    예: "2025.03.31", "2021.12.01" 등
+_DATE_RE = re.compile(r"(\d{4})\.(\d{2})\.(\d{2})")
 
 def find_wide_fms_indices(
     host='10.20.2.21',
@@ -12,54 +16,50 @@ def find_wide_fms_indices(
     1) 클러스터 내 모든 인덱스를 조회(cat.indices).
     2) 인덱스명에 특정 substring(기본 'fms')이 들어가는 인덱스만 필터링.
     3) 'YYYY.MM.DD' 형식의 날짜를 정규식으로 추출 시도(광범위 탐색).
-    4) 날짜가 파싱된 인덱스는 (인덱스명, datetime) 형태로 모아 날짜 오름차순 정렬.
+    4) 날짜가 파싱된 인덱스는 (datetime, 인덱스명) 형태로 모아 날짜 오름차순 정렬.
     5) 최종 목록, 가장 오래된(가장 과거 날짜) 인덱스, 날짜 파싱 실패 인덱스 목록을 반환.
     6) rscstatrawmonth-fms-YYYY.MM 형식의 인덱스가 데이터를 가지고 있는 파일.(월별)
     7) perfhist-fms-2025.06.01-01 형식의 인덱스도 데이터를 가지고 있음.(일별별)
     """
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
+    es = get_es(host, port, scheme)
 
     # 1) 모든 인덱스 이름 가져오기
-    response = es.cat.indices(h='index', s='index').strip()
+    response = es.cat.indices(h='index', s='index', format='json')
     if not response:
         return [], None, []
 
-    all_indices = response.split('\n')
-    
     # 2) substring('fms')이 들어가는 인덱스 필터링
-    fms_indices = [idx for idx in all_indices if substring in idx]
-
-    # 3) 날짜 추출(YYYY.MM.DD) 정규식 준비
-    #    예: "2025.03.31", "2021.12.01" 등
-    date_pattern = re.compile(r"(\d{4}\.\d{2}\.\d{2})")
+    fms_indices = [row['index'] for row in response if substring in row['index']]
 
     parsed_list = []
     not_parsed_list = []
     
+    # 3) 인덱스명에서 날짜(YYYY.MM.DD) 추출
     for idx_name in fms_indices:
-        match = date_pattern.search(idx_name)  # 인덱스명 어딘가에 날짜가 있으면 매칭
+        match = _DATE_RE.search(idx_name)  # 인덱스명 어딘가에 날짜가 있으면 매칭
         if match:
-            date_str = match.group(1)  # 예: "2025.03.31"
             try:
-                dt_obj = datetime.strptime(date_str, "%Y.%m.%d")
-                parsed_list.append((idx_name, dt_obj))
+                # 정규식이 숫자 그룹을 보장하므로 strptime 없이 바로 생성
+                dt_obj = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+                parsed_list.append((dt_obj, idx_name))
             except ValueError:
-                # 날짜 파싱 실패(패턴은 맞았는데 실제 변환 실패)
+                # 날짜 파싱 실패(패턴은 맞았는데 실제 변환 실패, 예: 2025.02.30)
                 not_parsed_list.append(idx_name)
         else:
             # 날짜 정규식이 전혀 안 잡히는 인덱스
             not_parsed_list.append(idx_name)
 
     # 4) 날짜 파싱에 성공한 인덱스들 정렬(오래된 순)
-    parsed_list.sort(key=lambda x: x[1])
+    #    (날짜, 인덱스명) 튜플이므로 key 함수 없이 정렬, 같은 날짜는 인덱스명 순
+    parsed_list.sort()
     
     if parsed_list:
-        oldest_index = parsed_list[0][0]
+        oldest_index = parsed_list[0][1]
     else:
         oldest_index = None
 
     # (인덱스명, "YYYY-MM-DD")로 최종 가공
-    sorted_result = [(name, dt.strftime("%Y-%m-%d")) for name, dt in parsed_list]
+    sorted_result = [(name, f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}") for dt, name in parsed_list]
 
     return sorted_result, oldest_index, not_parsed_list
 
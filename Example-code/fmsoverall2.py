@@ -1,23 +1,25 @@
 import json
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
 
 def get_index_mapping(index_name, host='10.20.2.21', port=59200, scheme='http'):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
+    es = get_es(host, port, scheme)
     # 매핑 정보 확인
     mapping = es.indices.get_mapping(index=index_name)
     return mapping
 
 def get_sample_docs(index_name, size=5, host='10.20.2.21', port=59200, scheme='http'):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
+    es = get_es(host, port, scheme)
     # 샘플 문서 size건 match_all 쿼리
     response = es.search(
         index=index_name,
         size=size,
+        filter_path=["hits.hits._source"],  # 출력에 쓰는 _source만 응답에 포함
         query={
             "match_all": {}
         }
     )
-    return response["hits"]["hits"]
+    # 결과가 0건이면 filter_path로 hits 자체가 빠지므로 get으로 접근
+    return response.get("hits", {}).get("hits", [])
 
 if __name__ == "__main__":
     # index_name = "rscstatrawmonth-fms-2024.05"
@@ -15,7 +15,7 @@
 """
 
 import re
-from elasticsearch import Elasticsearch
+from _es_utils import get_es, cat_indices, human_size
 
 def get_indices_size_and_docs(index_pattern="*", host="10.20.2.21", port=59200, scheme="http"):
     """
@@ -29,37 +29,16 @@ def get_indices_size_and_docs(index_pattern="*", host="10.20.2.21", port=59200,
         List[dict] 형태: [
           {
             "index": "...",
-            "store_size": "...",
+            "store_size": <int, bytes>,
             "docs_count": <int>
           },
           ...
         ]
     """
-    es = Elasticsearch([{"host": host, "port": port, "scheme": scheme}])
+    es = get_es(host, port, scheme)
 
-    # h 파라미터로 인덱스, store.size, docs.count를 가져옴
-    # s='index' -> 인덱스명 기준으로 정렬
-    cat_response = es.cat.indices(index=index_pattern, h="index,store.size,docs.count", s="index")
-    if not cat_response:
-        return []
-
-    lines = cat_response.strip().split("\n")
-    results = []
-    for line in lines:
-        parts = line.split()
-        if len(parts) < 3:
-            continue
-        idx_name, store_size, docs_count_str = parts[0], parts[1], parts[2]
-        try:
-            docs_count = int(docs_count_str)
-        except ValueError:
-            docs_count = 0
-        results.append({
-            "index": idx_name,
-            "store_size": store_size,
-            "docs_count": docs_count
-        })
-    return results
+    # 인덱스명 순으로 index, store.size(bytes), docs.count를 가져옴
+    return cat_indices(es, index_pattern)
 
 if __name__ == "__main__":
     # 예: rscstatrawmonth-fms-*, rscstatrawweek-fms-*, rscstatrawyear-fms-*
@@ -78,4 +57,4 @@ if __name__ == "__main__":
             continue
         
         for info in info_list:
-            print(f" - {info['index']} | size={info['store_size']} | docs={info['docs_count']}")
+            print(f" - {info['index']} | size={human_size(info['store_size'])} | docs={info['docs_count']}")
@@ -32,89 +32,95 @@ rscstatrawweek-fms-2025.01          | size= 55.9mb, docs= 194544, earliest=2024-
 """
 
 import json
-import math
 from datetime import datetime
-from elasticsearch import Elasticsearch
+from concurrent.futures import ThreadPoolExecutor
+from _es_utils import get_es, SEARCH_PREFERENCE, cat_indices, human_size
 
 def cat_indices_info(index_pattern, es_client):
     """
     cat.indices API를 호출해, 
      - 인덱스명
-     - store.size
+     - store.size (bytes, int)
      - docs.count
     를 가져온다.
     """
-    cat_response = es_client.cat.indices(index=index_pattern, h="index,store.size,docs.count", s="index")
-    if not cat_response:
-        return []
-    
-    lines = cat_response.strip().split("\n")
-    results = []
-    for line in lines:
-        parts = line.split()
-        if len(parts) < 3:
-            continue
-        idx_name, size_str, docs_str = parts[0], parts[1], parts[2]
-        try:
-            docs_count = int(docs_str)
-        except ValueError:
-            docs_count = 0
-        results.append({
-            "index": idx_name,
-            "store_size": size_str,
-            "docs_count": docs_count
-        })
-    return results
+    return cat_indices(es_client, index_pattern)
 
 def get_earliest_latest_ts(index_name, es_client, time_field="@timestamp"):
     """
     해당 인덱스에서 time_field 기준 가장 빠른/가장 늦은 문서의 타임스탬프를 각각 반환
     (문서가 없으면 (None, None))
+    정렬+문서 조회 2번 대신 min/max 집계 1번으로 처리
     """
-    # Earliest
-    earliest_res = es_client.search(
+    resp = es_client.search(
         index=index_name,
-        size=1,
+        size=0,
+        request_cache=True,  # 같은 인덱스를 다시 조회하면 shard request cache에서 바로 응답
+        preference=SEARCH_PREFERENCE,
         query={"match_all": {}},
-        sort=[{time_field: {"order": "asc"}}]
+        filter_path=["aggregations.*.value_as_string"],
+        aggs={
+            "min_ts": {"min": {"field": time_field}},
+            "max_ts": {"max": {"field": time_field}}
+        }
     )
-    earliest_hits = earliest_res["hits"]["hits"]
-    if not earliest_hits:
-        return (None, None)
-    earliest_ts = earliest_hits[0]["_source"].get(time_field)
+    # 문서가 없으면 value_as_string이 없어서 filter_path 결과에서 빠짐
+    aggs = resp.get("aggregations", {})
+    return (aggs.get("min_ts", {}).get("value_as_string"), aggs.get("max_ts", {}).get("value_as_string"))
 
-    # Latest
-    latest_res = es_client.search(
-        index=index_name,
-        size=1,
-        query={"match_all": {}},
-        sort=[{time_field: {"order": "desc"}}]
-    )
-    latest_hits = latest_res["hits"]["hits"]
-    if not latest_hits:
-        return (None, None)
-    latest_ts = latest_hits[0]["_source"].get(time_field)
+def get_earliest_latest_ts_msearch(index_names, es_client, time_field="@timestamp"):
+    """
+    여러 인덱스의 earliest/latest 타임스탬프를 msearch 한 번(HTTP 1회)으로 조회
+    인덱스별 min/max 집계 요청을 묶어서 보내면 ES가 검색 스레드풀에서 병렬로 처리함
 
-    return (earliest_ts, latest_ts)
+    Returns:
+        list: index_names 순서대로 (earliest_ts, latest_ts) 튜플 목록
+    """
+    if not index_names:
+        return []
+
+    body = []
+    for idx_name in index_names:
+        # size:0 집계라 shard request cache 대상 (header에 request_cache 지정)
+        body.append({"index": idx_name, "request_cache": True, "preference": SEARCH_PREFERENCE})
+        body.append({
+            "size": 0,
+            "query": {"match_all": {}},
+            "aggs": {
+                "min_ts": {"min": {"field": time_field}},
+                "max_ts": {"max": {"field": time_field}}
+            }
+        })
+
+    # took/error는 응답 배열의 순서(인덱스별 1:1 대응)를 유지하기 위해 남겨 둠
+    responses = es_client.msearch(
+        body=body,
+        filter_path=["responses.took", "responses.error", "responses.aggregations.*.value_as_string"]
+    ).get("responses", [])
+    results = []
+    for resp in responses:
+        # 검색 실패(error 응답) 또는 문서가 없으면 aggregations가 빠져 있음
+        aggs = resp.get("aggregations", {})
+        results.append((aggs.get("min_ts", {}).get("value_as_string"), aggs.get("max_ts", {}).get("value_as_string")))
+    return results
 
 def days_between(ts1, ts2):
     """
-    두 ISO8601 시간 문자열의 일수 차이(절대값).
-    예: 2024-06-01T03:00:00.000Z -> datetime 변환
+    두 ISO8601 시간 문자열의 일수 차이(절대값, 소수점 이하 버림).
+    예: 2024-06-01T03:00:00.000Z -> 앞 19자리(초 단위)만 파싱
+    ES가 돌려주는 값은 항상 UTC('Z')이므로 타임존/밀리초 파싱은 생략
     """
-    if not ts1 or not ts2:
+    if not ts1 or not ts2 or len(ts1) < 19 or len(ts2) < 19:
         return None
     try:
-        # Z(UTC) -> +00:00 변환
-        dt1 = datetime.fromisoformat(ts1.replace("Z", "+00:00"))
-        dt2 = datetime.fromisoformat(ts2.replace("Z", "+00:00"))
-        diff_days = abs((dt2 - dt1).total_seconds() / 86400.0)
-        return math.floor(diff_days)
-    except:
+        dt1 = datetime.fromisoformat(ts1[:19])
+        dt2 = datetime.fromisoformat(ts2[:19])
+    except ValueError:
         return None
+    return abs(dt2 - dt1).days
 
 if __name__ == "__main__":
-    es = Elasticsearch([{"host": "10.20.2.21", "port": 59200, "scheme": "http"}])
+    es = get_es("10.20.2.21", 59200, "http")
 
     # 조사할 인덱스 패턴들 (월별, 주별, 연별 등)
     index_patterns = [
@@ -126,41 +132,45 @@ if __name__ == "__main__":
     # 결과를 저장할 리스트
     results_all = []
 
-    for pat in index_patterns:
-        # cat.indices 해서 인덱스 목록+size+docs 가져오기
-        idx_info_list = cat_indices_info(pat, es)
-        for idx_info in idx_info_list:
-            idx_name = idx_info["index"]
-            store_size = idx_info["store_size"]
-            docs_count = idx_info["docs_count"]
-
-            # earliest/latest timestamp
-            e_ts, l_ts = get_earliest_latest_ts(idx_name, es)
-            if not e_ts or not l_ts:
-                # 문서가 없거나 time_field가 없는 경우
-                results_all.append({
-                    "index": idx_name,
-                    "store_size": store_size,
-                    "docs_count": docs_count,
-                    "earliest_ts": None,
-                    "latest_ts": None,
-                    "days_covered": 0
-                })
+    # cat.indices 해서 인덱스 목록+size+docs 가져오기 (패턴별 요청을 동시에 실행)
+    idx_info_list = []
+    with ThreadPoolExecutor(max_workers=len(index_patterns)) as executor:
+        for info_list in executor.map(lambda pat: cat_indices_info(pat, es), index_patterns):
+            idx_info_list.extend(info_list)
+
+    # 전체 인덱스의 earliest/latest를 msearch 한 번으로 조회
+    ts_list = get_earliest_latest_ts_msearch([info["index"] for info in idx_info_list], es)
+
+    for idx_info, (e_ts, l_ts) in zip(idx_info_list, ts_list):
+        idx_name = idx_info["index"]
+        store_size = idx_info["store_size"]
+        docs_count = idx_info["docs_count"]
+
+        if not e_ts or not l_ts:
+            # 문서가 없거나 time_field가 없는 경우
+            results_all.append({
+                "index": idx_name,
+                "store_size": store_size,
+                "docs_count": docs_count,
+                "earliest_ts": None,
+                "latest_ts": None,
+                "days_covered": 0
+            })
+        else:
+            day_diff = days_between(e_ts, l_ts)
+            if day_diff is not None:
+                # day_diff+1 하면 “실질적인 날짜 수”로 볼 수도 있음
+                days_covered = day_diff + 1
             else:
-                day_diff = days_between(e_ts, l_ts)
-                if day_diff is not None:
-                    # day_diff+1 하면 “실질적인 날짜 수”로 볼 수도 있음
-                    days_covered = day_diff + 1
-                else:
-                    days_covered = 0
-                results_all.append({
-                    "index": idx_name,
-                    "store_size": store_size,
-                    "docs_count": docs_count,
-                    "earliest_ts": e_ts,
-                    "latest_ts": l_ts,
-                    "days_covered": days_covered
-                })
+                days_covered = 0
+            results_all.append({
+                "index": idx_name,
+                "store_size": store_size,
+                "docs_count": docs_count,
+                "earliest_ts": e_ts,
+                "latest_ts": l_ts,
+                "days_covered": days_covered
+            })
 
     # 인덱스명 기준 정렬
     results_all.sort(key=lambda x: x["index"])
@@ -168,5 +178,5 @@ if __name__ == "__main__":
     # 출력
     print("\n=== rscstatraw(월/주/년) 인덱스 현황 종합 ===")
     for r in results_all:
-        print(f"{r['index']:35} | size={r['store_size']:>7}, docs={r['docs_count']:>7}, "
+        print(f"{r['index']:35} | size={human_size(r['store_size']):>7}, docs={r['docs_count']:>7}, "
               f"earliest={r['earliest_ts']}, latest={r['latest_ts']}, days={r['days_covered']}")
@@ -1,30 +1,37 @@
 import json
-from elasticsearch import Elasticsearch
+from _es_utils import get_es, SEARCH_PREFERENCE
 
 def get_index_mapping(index_name, host='10.20.2.21', port=59200, scheme='http'):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
+    es = get_es(host, port, scheme)
     # 매핑 정보 확인
     mapping = es.indices.get_mapping(index=index_name)
     return mapping
 
-def get_sample_docs(index_name, size=5, host='10.20.2.21', port=59200, scheme='http'):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
-    # 샘플 문서 size건 match_all 쿼리
+def get_sample_docs(index_name, size=5, host='10.20.2.21', port=59200, scheme='http', fields=None):
+    es = get_es(host, port, scheme)
+    # 샘플 문서 size건 match_all 쿼리 (fields를 주면 해당 필드만 _source로 가져옴)
     response = es.search(
         index=index_name,
         size=size,
+        preference=SEARCH_PREFERENCE,
+        filter_path=["hits.hits._source"],  # 출력에 쓰는 _source만 응답에 포함
+        _source=fields if fields is not None else True,
         query={
             "match_all": {}
         }
     )
-    return response["hits"]["hits"]
+    # 결과가 0건이면 filter_path로 hits 자체가 빠지므로 get으로 접근
+    return response.get("hits", {}).get("hits", [])
 
-def get_fth_docs(index_name, size=24, host='10.20.2.21', port=59200, scheme='http'):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
-    # rsctypeId가 "FTH"이고 objId가 197인 문서들을 조회
+def get_fth_docs(index_name, size=24, host='10.20.2.21', port=59200, scheme='http', fields=None):
+    es = get_es(host, port, scheme)
+    # rsctypeId가 "FTH"이고 objId가 197인 문서들을 조회 (fields를 주면 해당 필드만 _source로 가져옴)
     response = es.search(
         index=index_name,
         size=size,
+        preference=SEARCH_PREFERENCE,
+        filter_path=["hits.hits._source"],  # 출력에 쓰는 _source만 응답에 포함
+        _source=fields if fields is not None else True,
         query={
             "bool": {
                 "must": [
@@ -34,7 +41,8 @@ def get_fth_docs(index_name, size=24, host='10.20.2.21', port=59200, scheme='htt
             }
         }
     )
-    return response["hits"]["hits"]
+    # 결과가 0건이면 filter_path로 hits 자체가 빠지므로 get으로 접근
+    return response.get("hits", {}).get("hits", [])
 
 
 if __name__ == "__main__":
@@ -1,14 +1,14 @@
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
 
 def list_indices(host='10.20.2.21', port=59200, scheme='http'):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': scheme}])
+    es = get_es(host, port, scheme)
 
     try:
-        indices = es.cat.indices(format='json')
-        index_names = sorted([idx['index'] for idx in indices])
+        # 인덱스명만 받고(h='index'), 정렬도 ES에서 해서 받음(s='index')
+        indices = es.cat.indices(format='json', h='index', s='index')
         print("📦 Elasticsearch Index List:")
-        for name in index_names:
-            print(f" - {name}")
+        for row in indices:
+            print(f" - {row['index']}")
     except Exception as e:
         print("❌ Failed to fetch index list:", e)
 
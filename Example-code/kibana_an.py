@@ -5,7 +5,7 @@
 
 """
 
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
 
 def check_objId_overlap(index_pattern, host="10.20.2.21", port=59200):  # Kibana 포트 지울려다가 남김
     """
@@ -22,44 +22,35 @@ def check_objId_overlap(index_pattern, host="10.20.2.21", port=59200):  # Kibana
     """
 
     # scheme="http" 추가
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    es = get_es(host, port)
 
-    # 1. 모든 rsctypeId 값 가져오기
-    rsc_types_query = {
+    # 1. rsctypeId -> objId 2단계 terms 집계를 한 번의 검색으로 가져오기
+    query = {
         "size": 0,
         "aggs": {
-            "rsctypeId_values": {
+            "by_rsc": {
                 "terms": {
                     "field": "rsctypeId",
                     "size": 10000  # 충분히 큰 값
+                },
+                "aggs": {
+                    "by_obj": {
+                        "terms": {
+                            "field": "objId",
+                            "size": 10000  # objId 개수만큼 충분히 크게
+                        }
+                    }
                 }
             }
         }
     }
-    rsc_types_response = es.search(index=index_pattern, body=rsc_types_query)
-    rsctype_ids = [bucket["key"] for bucket in rsc_types_response["aggregations"]["rsctypeId_values"]["buckets"]]
+    # size:0 집계 전용 쿼리라 shard request cache에 결과가 캐시되도록 명시
+    response = es.search(index=index_pattern, request_cache=True, filter_path=["aggregations"], **query)
 
-    # 2. 각 rsctypeId 별로 objId 값 가져오기
+    # 2. 각 rsctypeId 별로 objId 값 정리
     objId_by_rsctype = {}
-    for rsctype_id in rsctype_ids:
-        objId_query = {
-            "size": 0,
-            "query": {
-                "term": {
-                    "rsctypeId": rsctype_id
-                }
-            },
-            "aggs": {
-                "object_id_values": {
-                    "terms": {
-                        "field": "objId",
-                        "size": 10000  # objId 개수만큼 충분히 크게
-                    }
-                }
-            }
-        }
-        objId_response = es.search(index=index_pattern, body=objId_query)
-        objId_by_rsctype[rsctype_id] = [bucket["key"] for bucket in objId_response["aggregations"]["object_id_values"]["buckets"]]
+    for bucket in response["aggregations"]["by_rsc"]["buckets"]:
+        objId_by_rsctype[bucket["key"]] = [b["key"] for b in bucket["by_obj"]["buckets"]]
 
     # 3. objId 중복 검사
     all_objIds = set()
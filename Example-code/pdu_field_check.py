@@ -1,29 +1,82 @@
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
 import json
 
+def _mapping_field_names(es, index_pattern):
+    """
+    index_pattern에 매칭되는 모든 인덱스 매핑의 최상위 필드명 합집합
+    (클러스터 상태에서 바로 응답하므로 문서를 읽지 않음)
+    """
+    mapping = es.indices.get_mapping(index=index_pattern)
+
+    field_names = set()
+    for idx_mapping in mapping.values():
+        mappings = idx_mapping.get("mappings", {})
+        if "properties" in mappings:
+            # ES 7+ (타입 없음)
+            field_names.update(mappings["properties"].keys())
+        else:
+            # ES 6 이하 (타입별 매핑, 예: "doc")
+            for type_mapping in mappings.values():
+                field_names.update(type_mapping.get("properties", {}).keys())
+    return field_names
+
 def get_fields_for_rsctype(
     index_pattern,
     rsc_type='FPDUS',
     host='10.20.2.21',
     port=59200,
-    sample_size=1000
+    sample_size=1000,
+    deep=False
 ):
     """
     특정 rsctypeId 문서에서 실제로 사용 중인 필드를 조사합니다.
-    (샘플 문서 _source 기준)
+    기본값은 매핑에서 필드 후보를 가져온 뒤, rsctypeId로 필터링한 size:0 검색에서
+    필드별 exists 집계로 실제 값이 있는 필드만 남깁니다. (문서 _source 전송 없음)
+    deep=True이면 예전처럼 샘플 문서 _source를 직접 읽어서 조사합니다.
     
     Args:
         index_pattern (str): 조회할 인덱스 패턴 (예: "perfhist-fms*").
         rsc_type (str): 필터링할 rsctypeId (예: "FPDUS").
         host (str): Elasticsearch/Kibana host
         port (int): Elasticsearch/Kibana port
-        sample_size (int): 가져올 샘플 문서 수 (최대)
+        sample_size (int): 가져올 샘플 문서 수 (최대, deep=True일 때만 사용)
+        deep (bool): 샘플 문서 _source 기준으로 조사할지 여부
     
     Returns:
         set: rsctypeId=rsc_type 문서에서 발견된 필드들의 집합
     """
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    es = get_es(host, port)
+
+    if deep:
+        return _get_fields_from_samples(es, index_pattern, rsc_type, sample_size)
+
+    candidates = _mapping_field_names(es, index_pattern)
+    if not candidates:
+        return set()
+
+    # 필드별로 값이 존재하는 문서 수를 한 번의 집계로 확인
+    query = {
+        "size": 0,
+        "query": {
+            "term": {
+                "rsctypeId": rsc_type
+            }
+        },
+        "aggs": {
+            "field_exists": {
+                "filters": {
+                    "filters": {name: {"exists": {"field": name}} for name in candidates}
+                }
+            }
+        }
+    }
+
+    response = es.search(index=index_pattern, body=query)
+    buckets = response["aggregations"]["field_exists"]["buckets"]
+    return {name for name, bucket in buckets.items() if bucket["doc_count"] > 0}
 
+def _get_fields_from_samples(es, index_pattern, rsc_type, sample_size):
+    """샘플 문서 _source 기준 필드 조사 (deep=True)"""
     # rsctypeId로 필터링해서 sample_size 만큼 문서 가져오기
     query = {
         "size": sample_size,
@@ -59,6 +112,6 @@ if __name__ == "__main__":
         sample_size=1000
     )
 
-    print(f"[rsctypeId={rsc_type}] 샘플 문서 기준 발견된 필드 목록 (총 {len(fields)}개):")
+    print(f"[rsctypeId={rsc_type}] 발견된 필드 목록 (총 {len(fields)}개):")
     for f in sorted(fields):
         print(f" - {f}")
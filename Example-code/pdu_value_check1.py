@@ -1,8 +1,8 @@
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
 import json
 
 def check_field_caps_for_fpuds(index_pattern, fields, host="10.20.2.21", port=59200):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    es = get_es(host, port)
 
     # field_caps API로 특정 필드만 조회 (fields=["OUTPUT_CURRENT","OUTPUT_POWER", ...])
     field_caps = es.field_caps(index=index_pattern, fields=fields)
@@ -1,20 +1,33 @@
-from elasticsearch import Elasticsearch
+from _es_utils import get_es
+from datetime import datetime, timedelta, timezone
 import json
 
 def get_stats_for_numeric_fields(
     index_pattern,
-    rsc_type="FPDUS",
+    rsc_types=("FPDUS",),
     numeric_fields=("OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE"),
     time_field="@timestamp",
-    time_range="now-1d",
+    time_range=timedelta(days=1),
     host="10.20.2.21",
     port=59200
 ):
     """
-    특정 rsctypeId와 시간 범위를 만족하는 문서에서,
-    numeric_fields에 대한 stats (min, max, avg, count 등) 조회
+    rsc_types에 포함된 rsctypeId들과 시간 범위를 만족하는 문서에서,
+    numeric_fields에 대한 stats (min, max, avg, count 등)를 rsctypeId별로 조회
+    (rsctypeId terms 집계 하위에 필드별 stats 집계를 두어 한 번의 검색으로 처리)
+
+    time_range가 timedelta면 현재 시각(UTC, 분 단위 절삭) 기준 절대 시각으로 바꿔서 보냄.
+    "now-1d" 같은 문자열을 그대로 넣으면 ES가 결과를 request cache에 올리지 않음
     """
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    es = get_es(host, port)
+
+    if isinstance(rsc_types, str):
+        rsc_types = [rsc_types]
+    rsc_types = list(rsc_types)
+
+    if isinstance(time_range, timedelta):
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        time_range = (now - time_range).strftime("%Y-%m-%dT%H:%M:%SZ")
 
     # stats 집계를 위해, 각 필드를 agg에 추가
     aggs_body = {}
@@ -30,35 +43,45 @@ def get_stats_for_numeric_fields(
         "query": {
             "bool": {
                 "must": [
-                    {"term": {"rsctypeId": rsc_type}},
+                    {"terms": {"rsctypeId": rsc_types}},
                     {"range": {time_field: {"gte": time_range}}}
                 ]
             }
         },
-        "aggs": aggs_body
+        "aggs": {
+            "by_rsc": {
+                "terms": {
+                    "field": "rsctypeId",
+                    "size": len(rsc_types)
+                },
+                "aggs": aggs_body
+            }
+        }
     }
 
-    response = es.search(index=index_pattern, body=query_body)
+    response = es.search(index=index_pattern, request_cache=True, filter_path=["aggregations"], **query_body)
 
     # 결과 출력
-    for f in numeric_fields:
-        stats_agg_key = f"_stats_{f}"
-        if stats_agg_key in response["aggregations"]:
-            agg_result = response["aggregations"][stats_agg_key]
-            print(f"\n=== Field: {f} ===")
-            print(f"Count: {agg_result['count']}")
-            print(f"Min:   {agg_result['min']}")
-            print(f"Max:   {agg_result['max']}")
-            print(f"Avg:   {agg_result['avg']}")
-            print(f"Sum:   {agg_result['sum']}")
+    for bucket in response["aggregations"]["by_rsc"]["buckets"]:
+        print(f"\n##### rsctypeId: {bucket['key']} (docs: {bucket['doc_count']}) #####")
+        for f in numeric_fields:
+            stats_agg_key = f"_stats_{f}"
+            if stats_agg_key in bucket:
+                agg_result = bucket[stats_agg_key]
+                print(f"\n=== Field: {f} ===")
+                print(f"Count: {agg_result['count']}")
+                print(f"Min:   {agg_result['min']}")
+                print(f"Max:   {agg_result['max']}")
+                print(f"Avg:   {agg_result['avg']}")
+                print(f"Sum:   {agg_result['sum']}")
 
 if __name__ == "__main__":
     index_pattern = "perfhist-fms*"
     fields_to_check = ("OUTPUT_CURRENT", "OUTPUT_FACTOR", "OUTPUT_POWER", "OUTPUT_VOLTAGE")
     get_stats_for_numeric_fields(
         index_pattern=index_pattern,
-        rsc_type="FPDUS",
+        rsc_types=("FPDUS",),
         numeric_fields=fields_to_check,
         time_field="@timestamp",
-        time_range="now-1d"
+        time_range=timedelta(days=1)
     )
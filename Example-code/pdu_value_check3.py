@@ -1,6 +1,5 @@
-from elasticsearch import Elasticsearch
+from _es_utils import get_es, SEARCH_PREFERENCE
 import json
-from datetime import datetime
 
 def get_latest_documents(
     index_pattern,
@@ -13,10 +12,13 @@ def get_latest_documents(
     """
     특정 rsctypeId에 대한 가장 최근 문서 10개 조회
     """
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    es = get_es(host, port)
 
     query_body = {
         "size": size,
+        # 출력에 쓰는 필드만 가져오기 (source filtering)
+        "_source": [time_field, "objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE",
+                    "OUTPUT_FACTOR", "rsctypeId", "rscId", "metric_type"],
         "query": {
             "bool": {
                 "must": [
@@ -26,31 +28,28 @@ def get_latest_documents(
         },
         "sort": [
             {time_field: {"order": "desc"}}  # 최신 데이터부터 정렬
-        ]
+        ],
+        "track_total_hits": False  # 전체 개수 계산 생략 (상위 size개만 필요)
     }
 
     # 경고 해결: body 파라미터 대신 직접 파라미터 사용
-    response = es.search(index=index_pattern, **query_body)
+    response = es.search(
+        index=index_pattern,
+        preference=SEARCH_PREFERENCE,
+        filter_path=["hits.hits._source", "hits.hits._index"],
+        **query_body
+    )
+    # 결과가 0건이면 filter_path로 hits 자체가 빠지므로 get으로 접근
+    hits = response.get('hits', {}).get('hits', [])
     
-    # 총 개수 확인 수정
-    total_docs = response['hits']['total']
-    if isinstance(total_docs, dict) and 'value' in total_docs:
-        total_count = total_docs['value']
-    else:
-        total_count = total_docs  # 이전 버전 호환
+    print(f"최근 {size}개 조회:")
     
-    print(f"총 {total_count}개 문서 중 최근 {size}개 조회:")
-    
-    for i, doc in enumerate(response['hits']['hits']):
+    for i, doc in enumerate(hits):
         source = doc['_source']
         timestamp = source.get(time_field, "No timestamp")
-        if isinstance(timestamp, str) and timestamp.endswith('Z'):
-            # ISO 형식 날짜 변환
-            try:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                timestamp = dt.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
+        if isinstance(timestamp, str) and len(timestamp) >= 19:
+            # "2025-05-28T03:00:05.123Z" -> "2025-05-28 03:00:05"
+            timestamp = timestamp[:10] + " " + timestamp[11:19]
                 
         print(f"\n=== 문서 {i+1} ===")
         print(f"Timestamp: {timestamp}")
@@ -1,8 +1,13 @@
-from elasticsearch import Elasticsearch
+from _es_utils import get_es, SEARCH_PREFERENCE
 import json
-from datetime import datetime
 import os
 
+# 표 출력 형식 (모듈 로드 시 한 번만 생성)
+_HEADERS = ("#", "Timestamp", "objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE", "OUTPUT_FACTOR", "rscId")
+_COL_WIDTHS = (3, 22, 20, 15, 15, 15, 15, 20)
+_ROW_FMT = "".join(f"{{:{w}}}" for w in _COL_WIDTHS)
+_SEPARATOR = "-" * sum(_COL_WIDTHS)
+
 def get_latest_documents(
     index_pattern,
     rsc_type="FPDUS",
@@ -14,10 +19,13 @@ def get_latest_documents(
     """
     특정 rsctypeId에 대한 가장 최근 문서 10개를 표 형식으로 조회
     """
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    es = get_es(host, port)
 
     query_body = {
         "size": size,
+        # 출력에 쓰는 필드만 가져오기 (source filtering)
+        "_source": [time_field, "objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE",
+                    "OUTPUT_FACTOR", "rsctypeId", "rscId", "metric_type"],
         "query": {
             "bool": {
                 "must": [
@@ -27,51 +35,37 @@ def get_latest_documents(
         },
         "sort": [
             {time_field: {"order": "desc"}}  # 최신 데이터부터 정렬
-        ]
+        ],
+        "track_total_hits": False  # 전체 개수 계산 생략 (상위 size개만 필요)
     }
 
     # 경고 해결: body 파라미터 대신 직접 파라미터 사용
-    response = es.search(index=index_pattern, **query_body)
-    
-    # 총 개수 확인 수정
-    total_docs = response['hits']['total']
-    if isinstance(total_docs, dict) and 'value' in total_docs:
-        total_count = total_docs['value']
-    else:
-        total_count = total_docs  # 이전 버전 호환
+    response = es.search(
+        index=index_pattern,
+        preference=SEARCH_PREFERENCE,
+        filter_path=["hits.hits._source", "hits.hits._index"],
+        **query_body
+    )
+    # 결과가 0건이면 filter_path로 hits 자체가 빠지므로 get으로 접근
+    hits = response.get('hits', {}).get('hits', [])
     
-    print(f"총 {total_count}개 문서 중 최근 {size}개 조회:")
-    
-    # 헤더 및 구분선 정의
-    headers = ["#", "Timestamp", "objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE", "OUTPUT_FACTOR", "rscId"]
-    col_widths = [3, 22, 20, 15, 15, 15, 15, 20]
+    print(f"최근 {size}개 조회:")
     
     # 헤더 출력
-    header_format = ""
-    for i, width in enumerate(col_widths):
-        header_format += f"{{:{width}}}"
-    print("\n" + header_format.format(*headers))
+    print("\n" + _ROW_FMT.format(*_HEADERS))
     
     # 구분선 출력
-    separator = "-" * sum(col_widths)
-    print(separator)
+    print(_SEPARATOR)
     
     # 데이터 행 출력
-    row_format = ""
-    for i, width in enumerate(col_widths):
-        row_format += f"{{:{width}}}"
-    
-    for i, doc in enumerate(response['hits']['hits']):
+    for i, doc in enumerate(hits):
         source = doc['_source']
         
         # 타임스탬프 변환
         timestamp = source.get(time_field, "No timestamp")
-        if isinstance(timestamp, str) and timestamp.endswith('Z'):
-            try:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                timestamp = dt.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
+        if isinstance(timestamp, str) and len(timestamp) >= 19:
+            # "2025-05-28T03:00:05.123Z" -> "2025-05-28 03:00:05"
+            timestamp = timestamp[:10] + " " + timestamp[11:19]
         
         # 값 준비 및 길이 제한
         obj_id = str(source.get("objId", "N/A"))[:19]
@@ -83,11 +77,11 @@ def get_latest_documents(
         
         # 행 출력
         row = [str(i+1), timestamp, obj_id, output_current, output_power, output_voltage, output_factor, rsc_id]
-        print(row_format.format(*row))
+        print(_ROW_FMT.format(*row))
     
     # 추가 정보
-    if response['hits']['hits']:
-        print(f"\n* 인덱스: {response['hits']['hits'][0]['_index']}")
+    if hits:
+        print(f"\n* 인덱스: {hits[0]['_index']}")
         print(f"* rsctypeId: {rsc_type}")
 
 if __name__ == "__main__":
@@ -1,18 +1,191 @@
-from elasticsearch import Elasticsearch
-from datetime import datetime
+from _es_utils import get_es
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import threading
+import io
+import queue
 import os
 import csv
 
+# 타임스탬프의 'T' -> ' ' 변환 테이블
+_TT = str.maketrans({'T': ' '})
+
+# CSV에서 Timestamp 뒤에 오는 컬럼들 (헤더 순서와 같음)
+_KEYS = ("objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE", "OUTPUT_FACTOR", "rscId")
+
+try:
+    import pyarrow as pa
+    # Parquet 저장 시 스키마 (CSV의 '#' 열은 행 번호라 저장하지 않음)
+    _PARQUET_SCHEMA = pa.schema([
+        ("Timestamp", pa.timestamp('ms', tz='UTC')),
+        ("objId", pa.int64()),
+        ("OUTPUT_CURRENT", pa.float32()),
+        ("OUTPUT_POWER", pa.float32()),
+        ("OUTPUT_VOLTAGE", pa.float32()),
+        ("OUTPUT_FACTOR", pa.float32()),
+        ("rscId", pa.string()),
+    ])
+except ImportError:
+    # CSV로만 저장할 때는 pyarrow 없이도 동작
+    pa = None
+    _PARQUET_SCHEMA = None
+
+# search_after를 나눠서 돌릴 시간 구간 길이 (하루)
+_DAY_MS = 24 * 60 * 60 * 1000
+
+def _get_time_bounds(es, index_pattern, query, time_field):
+    """query에 해당하는 문서의 time_field 최솟값/최댓값(epoch ms)을 min/max 집계 한 번으로 조회 (문서가 없으면 (None, None))"""
+    resp = es.search(
+        index=index_pattern,
+        size=0,
+        query=query,
+        filter_path=["aggregations.*.value"],
+        aggs={
+            "min_ts": {"min": {"field": time_field}},
+            "max_ts": {"max": {"field": time_field}}
+        }
+    )
+    aggs = resp.get("aggregations", {})
+    return aggs.get("min_ts", {}).get("value"), aggs.get("max_ts", {}).get("value")
+
+def _search_after_range(es, index_pattern, query, time_field, gte, lt, batch_size, fields, out_q):
+    """
+    [gte, lt) 시간 구간(epoch ms)의 문서를 (time_field, _id) 정렬 + search_after로 끝까지 읽어서
+    페이지마다 {필드: 값} dict 목록을 out_q에 넣음 (반환값: 읽은 문서 수)
+    scroll과 달리 서버에 검색 컨텍스트를 남기지 않음
+
+    _source는 fields만 includes로 걸러서 받음
+    (docvalue_fields는 float 필드를 double로 넓혀서 돌려주므로(4.9 -> 4.900000095367432) 원본 값과 달라짐)
+    """
+    body = {
+        "query": {
+            "bool": {
+                "filter": [
+                    query,
+                    {"range": {time_field: {"gte": gte, "lt": lt, "format": "epoch_millis"}}}
+                ]
+            }
+        },
+        # _id로 같은 타임스탬프 문서의 순서를 고정해야 search_after에서 누락/중복이 없음
+        "sort": [{time_field: "asc"}, {"_id": "asc"}],
+        "size": batch_size,
+        "track_total_hits": False,  # 전체 건수는 안 쓰므로 집계 생략
+        "_source": {"includes": list(fields)}
+    }
+
+    count = 0
+    while True:
+        resp = es.search(
+            index=index_pattern,
+            filter_path=["hits.hits._source", "hits.hits.sort"],
+            **body
+        )
+        hits = resp.get("hits", {}).get("hits", [])
+        if not hits:
+            break
+        out_q.put([hit.get('_source', {}) for hit in hits])
+        count += len(hits)
+        if len(hits) < batch_size:
+            break
+        body["search_after"] = hits[-1]["sort"]
+    return count
+
+def _write_csv(out_q, out_csv, time_field):
+    """out_q에서 _source 묶음을 꺼내 CSV로 저장 (None을 받으면 종료, 반환값: 저장한 행 수)"""
+    # prepare CSV
+    headers = ["#", "Timestamp", *_KEYS]
+    with contextlib.ExitStack() as stack:
+        if out_csv.endswith(".zst"):
+            # .zst로 끝나면 zstd(level 3, 내부 멀티스레드)로 압축하면서 씀
+            import zstandard as zstd
+            raw = stack.enter_context(open(out_csv, mode="wb"))
+            comp = stack.enter_context(zstd.ZstdCompressor(level=3, threads=-1).stream_writer(raw))
+            f_csv = stack.enter_context(io.TextIOWrapper(comp, encoding="utf-8", newline=""))
+        else:
+            # 1MB 버퍼로 열어서 실제 파일 쓰기 횟수를 줄임
+            f_csv = stack.enter_context(open(out_csv, mode="w", newline="", encoding="utf-8", buffering=1 << 20))
+        writer = csv.writer(f_csv)
+        writer.writerow(headers)
+
+        idx = 0
+        rows = []
+        while True:
+            batch = out_q.get()
+            if batch is None:
+                break
+            for src in batch:
+                idx += 1
+
+                # timestamp normalization
+                # ES 타임스탬프가 이미 'YYYY-MM-DDTHH:MM:SS(.fff)Z' 형식이라 앞 19자만 잘라 T를 공백으로 바꿈
+                ts = src.get(time_field, "")
+                ts = ts[:19].translate(_TT) if isinstance(ts, str) else ""
+
+                rows.append([idx, ts, *[src.get(k, "") for k in _KEYS]])
+            # 페이지 단위로 한 번에 쓰기
+            writer.writerows(rows)
+            rows.clear()
+    return idx
+
+def _write_parquet(out_q, out_path, time_field):
+    """
+    out_q에서 _source 묶음을 꺼내 묶음마다 RecordBatch 하나로 Parquet에 씀 (반환값: 저장한 행 수)
+    타임스탬프는 문자열로 바꾸지 않고 timestamp(ms, UTC) 그대로 저장
+    """
+    import pyarrow.parquet as pq
+
+    writer = pq.ParquetWriter(out_path, _PARQUET_SCHEMA, compression='snappy', use_dictionary=True)
+    total = 0
+    try:
+        while True:
+            batch = out_q.get()
+            if batch is None:
+                break
+            cols = [
+                # ES 타임스탬프(ISO8601, 'Z')는 Arrow가 C에서 바로 파싱
+                pa.array([src.get(time_field) for src in batch], type=pa.string()).cast(pa.timestamp('ms', tz='UTC')),
+                pa.array([src.get("objId") for src in batch], type=pa.int64()),
+                pa.array([src.get("OUTPUT_CURRENT") for src in batch], type=pa.float32()),
+                pa.array([src.get("OUTPUT_POWER") for src in batch], type=pa.float32()),
+                pa.array([src.get("OUTPUT_VOLTAGE") for src in batch], type=pa.float32()),
+                pa.array([src.get("OUTPUT_FACTOR") for src in batch], type=pa.float32()),
+                pa.array([src.get("rscId") for src in batch], type=pa.string()),
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(cols, schema=_PARQUET_SCHEMA))
+            total += len(batch)
+    finally:
+        writer.close()
+    return total
+
+def convert_csv_to_parquet(csv_path, pq_path):
+    """
+    get_all_documents_to_csv로 저장한 CSV를 Parquet(zstd)으로 한 번 변환
+    objId/rscId는 값 종류가 적어서 dictionary 인코딩, 이후에는 필요한 열만 읽으면 됨
+    """
+    import pyarrow.csv as pvcsv
+    import pyarrow.parquet as pq
+
+    table = pvcsv.read_csv(csv_path)
+    pq.write_table(table, pq_path, compression='zstd', use_dictionary=['objId', 'rscId'])
+    print(f"* parquet saved to: {os.path.abspath(pq_path)}  (rows: {table.num_rows})")
+
 def get_all_documents_to_csv(
     index_pattern,
     rsc_type="FPDUS",
-    batch_size=1000,
+    batch_size=10000,
     time_field="@timestamp",
     host="10.20.2.21",
     port=59200,
-    out_csv="all_pdu_readings.csv"
+    out_csv="all_pdu_readings.csv",
+    workers=4
 ):
-    es = Elasticsearch([{'host': host, 'port': port, 'scheme': 'http'}])
+    """
+    rsctypeId=rsc_type 문서를 하루 단위 시간 구간으로 나눠 search_after로 병렬(workers개 스레드) 조회해서 CSV로 저장
+    out_csv가 .parquet으로 끝나면 CSV 대신 Parquet(snappy)으로, .zst로 끝나면 zstd로 압축한 CSV로 저장
+    파일 쓰기는 writer 스레드 하나가 큐에서 꺼내서 처리하므로 행이 섞이거나 깨지지 않음
+    (구간 안에서는 시간순이지만 구간끼리의 행 순서는 보장하지 않음)
+    """
+    es = get_es(host, port)
 
     query_body = {
         "query": {
@@ -23,62 +196,63 @@ def get_all_documents_to_csv(
             }
         }
     }
+    fields = [time_field, *_KEYS]
 
-    # kick off the scroll
-    page = es.search(
-        index=index_pattern,
-        body=query_body,
-        scroll='2m',
-        size=batch_size,
-        _source_includes=[time_field, "objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE", "OUTPUT_FACTOR", "rscId"]
-    )
-    scroll_id = page['_scroll_id']
-    total = page['hits']['total']
-    total_count = total['value'] if isinstance(total, dict) else total
-    print(f"총 {total_count}개 문서 중 scroll로 모두 조회, batch size={batch_size}")
-
-    # prepare CSV
-    headers = ["#", "Timestamp", "objId", "OUTPUT_CURRENT", "OUTPUT_POWER", "OUTPUT_VOLTAGE", "OUTPUT_FACTOR", "rscId"]
-    with open(out_csv, mode="w", newline="", encoding="utf-8") as f_csv:
-        writer = csv.writer(f_csv)
-        writer.writerow(headers)
+    # 전체 시간 범위를 구해서 하루 단위 구간 [gte, lt)로 나눔
+    min_ts, max_ts = _get_time_bounds(es, index_pattern, query_body["query"], time_field)
+    if min_ts is None:
+        print("조회할 문서가 없습니다.")
+        return
+    start = int(min_ts) // _DAY_MS * _DAY_MS
+    ranges = [(t, t + _DAY_MS) for t in range(start, int(max_ts) + 1, _DAY_MS)]
+    print(f"search_after로 모두 조회, 구간 {len(ranges)}개(하루 단위), workers={workers}, batch size={batch_size}")
 
-        idx = 0
-        hits = page['hits']['hits']
-        while hits:
-            for doc in hits:
-                idx += 1
-                src = doc['_source']
+    # 조회 스레드(생산자)가 페이지를 넣고 writer 스레드(소비자)가 꺼내 씀
+    # maxsize로 쓰기가 밀릴 때 메모리에 쌓이는 페이지 수를 제한 (넘으면 조회 스레드가 put에서 대기)
+    out_q = queue.Queue(maxsize=4)
+    written = [0]
+    write_error = [None]
 
-                # timestamp normalization
-                ts = src.get(time_field, "")
-                if isinstance(ts, str) and ts.endswith('Z'):
-                    try:
-                        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-                        ts = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    except:
-                        pass
-
-                row = [
-                    idx,
-                    ts,
-                    src.get("objId", ""),
-                    src.get("OUTPUT_CURRENT", ""),
-                    src.get("OUTPUT_POWER", ""),
-                    src.get("OUTPUT_VOLTAGE", ""),
-                    src.get("OUTPUT_FACTOR", ""),
-                    src.get("rscId", ""),
-                ]
-                writer.writerow(row)
+    def write_rows():
+        try:
+            # 확장자가 .parquet이면 Parquet, 그 외에는 CSV로 저장
+            if out_csv.endswith(".parquet"):
+                written[0] = _write_parquet(out_q, out_csv, time_field)
+            else:
+                written[0] = _write_csv(out_q, out_csv, time_field)
+        except Exception as e:
+            write_error[0] = e
+            # 조회 스레드가 가득 찬 큐에서 멈추지 않도록 종료 신호가 올 때까지 계속 비움
+            while out_q.get() is not None:
+                pass
 
-            # get next batch
-            page = es.scroll(scroll_id=scroll_id, scroll='2m')
-            scroll_id = page['_scroll_id']
-            hits = page['hits']['hits']
+    writer_thread = threading.Thread(target=write_rows)
+    writer_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 전체 건수는 검색(track_total_hits=False)과 별도로 count API로 한 번만 조회 (조회와 동시에 진행)
+            count_future = executor.submit(es.count, index=index_pattern, body={"query": query_body["query"]})
+            futures = [
+                executor.submit(_search_after_range, es, index_pattern, query_body["query"], time_field,
+                                gte, lt, batch_size, fields, out_q)
+                for gte, lt in ranges
+            ]
+            # 구간 하나라도 실패하면 여기서 예외가 다시 발생
+            for future in futures:
+                future.result()
+    finally:
+        # writer 스레드 종료 신호
+        out_q.put(None)
+        writer_thread.join()
+    if write_error[0] is not None:
+        raise write_error[0]
 
-    # clear the scroll context
-    es.clear_scroll(scroll_id=scroll_id)
-    print(f"* CSV saved to: {os.path.abspath(out_csv)}  (total rows: {idx})")
+    print(f"* saved to: {os.path.abspath(out_csv)}  (total rows: {written[0]})")
+    try:
+        print(f"  (ES count: {count_future.result()['count']})")
+    except Exception as e:
+        # 건수는 참고용이라 실패해도 저장 결과에는 영향 없음
+        print(f"  (ES count 조회 실패: {e})")
 
 
 if __name__ == "__main__":
@@ -1,11 +1,74 @@
-import json
-from datetime import datetime
+import heapq
+import os
+import tempfile
+from itertools import islice
+
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 정렬 키가 없는 값(timestamp 없음/humidity 없음)은 pandas 정렬과 같게 맨 뒤로 보냄
+_TS_LAST = 2 ** 63 - 1
+_HUM_LAST = float("inf")
+
+# pandas 2.0부터 to_datetime(format="ISO8601")로 형식이 섞인 ISO8601 문자열을 한 번에 파싱 가능
+_PANDAS_ISO8601 = int(pd.__version__.split(".")[0]) >= 2
+
+
+def _parse_timestamps(values):
+    """ISO8601 문자열 목록을 UTC DatetimeIndex로 변환 (None은 NaT)"""
+    if _PANDAS_ISO8601:
+        return pd.to_datetime(values, utc=True, format="ISO8601", cache=True)
+    # 이전 pandas에서는 레코드마다 ciso8601(C 파서)로 한 번씩만 파싱해서 넘김
+    # (pandas 2 이상에서는 쓰지 않으므로 여기서만 import)
+    import ciso8601
+    return pd.to_datetime(
+        [ciso8601.parse_datetime(v) if v else None for v in values], utc=True
+    )
+
+
+def _write_sorted_shard(lines, shard_path, timestamp_field, humidity_field):
+    """
+    lines(JSONL 원본 bytes 목록)를 (timestamp, humidity) 순으로 정렬해서
+    _ts(int64 ns), _hum(float64), line(원본 bytes) 세 컬럼의 Parquet 조각으로 저장
+    """
+    records = [orjson.loads(line) for line in lines]
+    ts = _parse_timestamps([rec.get(timestamp_field) for rec in records])
+    keys = pd.DataFrame({
+        # NaT는 int로 바꾸면 가장 작은 값이 되므로 맨 뒤로 가도록 치환
+        "_ts": pd.Series(ts.asi8).where(~ts.isna(), _TS_LAST),
+        "_hum": pd.to_numeric(
+            pd.Series([rec.get(humidity_field, 0) for rec in records], dtype=object), errors="coerce"
+        ).fillna(_HUM_LAST),
+    })
+    # 같은 키는 원래 순서 유지(mergesort)
+    keys = keys.sort_values(["_ts", "_hum"], kind="mergesort")
+
+    table = pa.table({
+        "_ts": pa.array(keys["_ts"].to_numpy(), type=pa.int64()),
+        "_hum": pa.array(keys["_hum"].to_numpy(), type=pa.float64()),
+        "line": pa.array([lines[i] for i in keys.index], type=pa.binary()),
+    })
+    pq.write_table(table, shard_path, compression="zstd")
+
+
+def _iter_shard(shard_path, shard_no):
+    """정렬된 Parquet 조각을 batch 단위로 읽으면서 (ts, hum, 조각번호, 위치, line) 튜플을 순서대로 반환"""
+    pos = 0
+    for batch in pq.ParquetFile(shard_path).iter_batches(batch_size=65536):
+        for ts, hum, line in zip(batch.column(0).to_pylist(), batch.column(1).to_pylist(), batch.column(2).to_pylist()):
+            # (조각번호, 위치)까지 키에 넣어 같은 (ts, hum)이면 입력 순서를 유지하고 line은 비교하지 않음
+            yield ts, hum, shard_no, pos, line
+            pos += 1
+
 
 def sort_jsonl_by_timestamp_and_humidity(
     input_file: str,
     output_file: str,
     timestamp_field: str = "@timestamp",
-    humidity_field: str = "HUMIDITY1"
+    humidity_field: str = "HUMIDITY1",
+    chunk_size: int = 500_000
 ):
     """
     input_file의 JSONL 데이터를
@@ -13,34 +76,28 @@ def sort_jsonl_by_timestamp_and_humidity(
     2) timestamp가 동일할 경우 humidity_field 기준 오름차순으로 정렬하여
     output_file에 저장합니다.
     ISO8601 형식의 밀리초(.%f) 유무를 모두 지원합니다.
+
+    파일 전체를 메모리에 올리지 않도록 chunk_size 줄씩 읽어 정렬한 조각(Parquet)을
+    임시 디렉터리에 쓴 뒤, heapq.merge로 합치면서 원본 줄을 그대로 output_file에 씁니다.
     """
-    # 1. 모든 레코드 읽어오기
-    with open(input_file, 'r', encoding='utf-8') as f:
-        records = [json.loads(line) for line in f if line.strip()]
-
-    # 2. timestamp 파싱 함수 정의
-    def parse_ts(ts: str) -> datetime:
-        # Z 제거
-        if ts.endswith("Z"):
-            ts = ts[:-1]
-        # 밀리초 처리
-        try:
-            return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%f")
-        except ValueError:
-            return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S")
-
-    # 3. 복합 정렬: (timestamp, humidity)
-    records.sort(
-        key=lambda rec: (
-            parse_ts(rec.get(timestamp_field, "")),
-            rec.get(humidity_field, 0)
-        )
-    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 1. chunk_size 줄씩 읽어서 정렬된 조각으로 저장
+        #    (orjson은 bytes를 바로 파싱하므로 바이너리 모드로 읽음)
+        shard_paths = []
+        with open(input_file, 'rb') as f:
+            non_empty = (line if line.endswith(b'\n') else line + b'\n' for line in f if line.strip())
+            while True:
+                lines = list(islice(non_empty, chunk_size))
+                if not lines:
+                    break
+                shard_path = os.path.join(tmp_dir, f"tmp_{len(shard_paths)}.parquet")
+                _write_sorted_shard(lines, shard_path, timestamp_field, humidity_field)
+                shard_paths.append(shard_path)
 
-    # 4. 정렬된 레코드 다시 쓰기
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for rec in records:
-            f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+        # 2. 정렬된 조각들을 k-way merge 하면서 원본 줄을 그대로 쓰기
+        with open(output_file, 'wb') as f:
+            merged = heapq.merge(*(_iter_shard(path, i) for i, path in enumerate(shard_paths)))
+            f.writelines(item[4] for item in merged)
 
 
 def main():
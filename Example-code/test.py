@@ -1,20 +1,25 @@
+import os
 import pandas as pd
 
-# CSV 파일 경로
+# CSV 파일 경로 (Parquet이 없으면 CSV에서 한 번 변환해서 사용)
 csv_file = "all_pdu_readings.csv"
+pq_file = "all_pdu_readings.parquet"
 
-# CSV 읽기 (헤더 없음)
-df = pd.read_csv(csv_file, header=None)
+try:
+    if not os.path.exists(pq_file):
+        from pdu_value_store import convert_csv_to_parquet
+        convert_csv_to_parquet(csv_file, pq_file)
 
-# 세 번째 열(index=2)이 ObjID라고 가정
-obj_ids = df[2]
+    # Parquet에서 objId 열만 읽기
+    obj_ids = pd.read_parquet(pq_file, columns=["objId"])["objId"]
+except ImportError:
+    # pyarrow가 없으면 CSV에서 objId 열만 읽고, C 파서가 바로 Int64로 변환하게 함
+    obj_ids = pd.read_csv(csv_file, usecols=["objId"], dtype={"objId": "Int64"}, on_bad_lines="skip")["objId"]
 
-# 'objId' 문자열 제거, 문자열로 변환 후 숫자 변환
-obj_ids_clean = pd.to_numeric(obj_ids[obj_ids != 'objId'], errors='coerce')
-
-# NaN 제거 후 고유값 추출, 정렬
-unique_sorted_objids = sorted(obj_ids_clean.dropna().unique())
+# null 제거 후 고유값 추출, 정렬
+unique_sorted_objids = obj_ids.dropna().astype("int64").unique()
+unique_sorted_objids.sort()
 
 # 출력
-print("고유 ObjID 목록 (정렬됨):", unique_sorted_objids)
+print("고유 ObjID 목록 (정렬됨):", list(unique_sorted_objids))
 print("고유 ObjID 개수:", len(unique_sorted_objids))
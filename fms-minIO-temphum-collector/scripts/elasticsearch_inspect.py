@@ -1,10 +1,28 @@
-import requests
-import json
+import orjson
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import TransportError
+from elasticsearch.serializer import JSONSerializer
 
 # Elasticsearch 접속 정보
 ES_HOST = "http://10.20.2.21:59200"  # 실제 주소로 변경
 INDEX_PATTERN = "perfhist-fms*"
 
+
+class OrjsonSerializer(JSONSerializer):
+    """elasticsearch 클라이언트의 요청/응답 JSON 처리를 orjson으로 바꾼 serializer"""
+
+    def dumps(self, data):
+        # 이미 문자열이면(직접 만든 NDJSON 등) 그대로 보냄
+        if isinstance(data, str):
+            return data
+        return orjson.dumps(data, default=self.default).decode()
+
+    def loads(self, s):
+        return orjson.loads(s)
+
+# 공식 클라이언트는 urllib3 커넥션 풀로 keep-alive 연결을 재사용함
+es = Elasticsearch([ES_HOST], serializer=OrjsonSerializer())
+
 # 검색할 날짜 범위 (UTC 기준)
 start_time = "2025-05-26T00:00:00Z"
 end_time = "2025-05-27T00:00:00Z"
@@ -24,20 +42,16 @@ query_body = {
     "sort": [{"@timestamp": {"order": "asc"}}]
 }
 
-# Elasticsearch 요청
-url = f"{ES_HOST.rstrip('/')}/{INDEX_PATTERN}/_search"
-headers = {"Content-Type": "application/json"}
-response = requests.post(url, headers=headers, data=json.dumps(query_body))
-
-# 결과 출력
-if response.status_code == 200:
-    data = response.json()
+# Elasticsearch 요청 및 결과 출력
+try:
+    data = es.search(index=INDEX_PATTERN, body=query_body)
+except TransportError as e:
+    print(f"❌ 요청 실패: {e.status_code} - {e.info}")
+else:
     hits = data.get("hits", {}).get("hits", [])
     if not hits:
         print("❌ 데이터가 없습니다.")
     else:
         print(f"✅ {len(hits)}개 문서가 검색되었습니다:")
         for doc in hits:
-            print(json.dumps(doc["_source"], indent=2, ensure_ascii=False))
-else:
-    print(f"❌ 요청 실패: {response.status_code} - {response.text}")
+            print(orjson.dumps(doc["_source"], option=orjson.OPT_INDENT_2).decode())
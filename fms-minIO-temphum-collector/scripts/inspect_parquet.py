@@ -8,12 +8,65 @@ Parquet 파일 검사 스크립트
 - 시간 범위 확인
 """
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import argparse
 from minio import Minio
-import tempfile
+import io
 import os
 
+def _column_min_max(pf, col_idx):
+    """
+    row group별 footer 통계(statistics)로 컬럼의 최솟값/최댓값을 구함
+    통계가 없는 row group이 있으면 해당 컬럼만 읽어서 계산
+    """
+    field_type = pf.schema_arrow.field(col_idx).type
+    # 시간대가 있는 timestamp는 footer 통계가 UTC datetime으로 나오므로 컬럼 시간대(KST)로 맞춤
+    to_column_tz = pa.types.is_timestamp(field_type) and field_type.tz is not None
+    col_min = col_max = None
+    for i in range(pf.metadata.num_row_groups):
+        stats = pf.metadata.row_group(i).column(col_idx).statistics
+        if stats is not None and stats.has_min_max:
+            group_min, group_max = stats.min, stats.max
+            if to_column_tz:
+                group_min = pa.scalar(group_min, type=field_type).as_py()
+                group_max = pa.scalar(group_max, type=field_type).as_py()
+        else:
+            min_max = pc.min_max(pf.read_row_group(i, columns=[pf.schema_arrow.names[col_idx]]).column(0))
+            group_min, group_max = min_max['min'].as_py(), min_max['max'].as_py()
+        if group_min is not None and (col_min is None or group_min < col_min):
+            col_min = group_min
+        if group_max is not None and (col_max is None or group_max > col_max):
+            col_max = group_max
+    return col_min, col_max
+
+def _count_distinct_rows(table):
+    """모든 컬럼을 문자열로 바꿔 구분자로 이어 붙인 합성 키로 고유 행 개수를 계산"""
+    key = pc.binary_join_element_wise(
+        *[pc.cast(col, pa.string()) for col in table.columns],
+        "\x1f",
+        null_handling="replace",
+        null_replacement="\x00"  # null과 빈 문자열을 구분
+    )
+    return pc.count_distinct(key).as_py()
+
+def sample_uniques(pf, col, cap=6):
+    """
+    컬럼을 batch 단위로 읽으면서 고유값을 모으다가 cap개를 넘으면 바로 중단
+    (표시용 샘플이라 전체 고유값을 다 구하지 않음, 처음 나온 순서 유지)
+    null/NaN은 고유값으로 세지 않음 (NaN은 서로 같지 않아서 dict로 모으면 여러 개가 따로 잡힘)
+    """
+    seen = {}
+    for batch in pf.iter_batches(columns=[col], batch_size=65536):
+        values = pc.drop_null(batch.column(0))
+        if pa.types.is_floating(values.type):
+            values = values.filter(pc.invert(pc.is_nan(values)))
+        seen.update(dict.fromkeys(values.to_pylist()))
+        if len(seen) > cap:
+            break
+    return list(seen)
+
 def inspect_parquet_file(minio_client, bucket_name, object_name):
     """Parquet 파일 내용 검사"""
     print(f"\n{'='*60}")
@@ -21,60 +74,69 @@ def inspect_parquet_file(minio_client, bucket_name, object_name):
     print(f"{'='*60}")
     
     try:
-        # MinIO에서 파일 다운로드
-        with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
-            minio_client.fget_object(bucket_name, object_name, tmp_file.name)
-            
-            # Parquet 파일 읽기
-            df = pd.read_parquet(tmp_file.name)
+        # MinIO에서 파일을 메모리(BytesIO)로 바로 받음 (디스크에 쓰고 다시 읽지 않음)
+        resp = minio_client.get_object(bucket_name, object_name)
+        try:
+            buf = io.BytesIO(resp.read())
+        finally:
+            resp.close()
+            resp.release_conn()
+        
+        # Parquet 파일 열기 (footer 메타데이터만 읽고 컬럼 데이터는 필요할 때만 읽음)
+        pf = pq.ParquetFile(buf)
+        metadata = pf.metadata
+        columns = pf.schema_arrow.names
+        num_rows = metadata.num_rows
+        
+        # 기본 정보
+        print(f"총 레코드 수: {num_rows:,}")
+        print(f"컬럼 수: {len(columns)}")
+        print(f"컬럼 목록: {columns}")
+        
+        if num_rows > 0:
+            # 첫 번째 레코드 (첫 row group만 읽음)
+            print(f"\n📍 첫 번째 레코드:")
+            first_record = pf.read_row_group(0).slice(0, 1).to_pylist()[0]
+            for col, val in first_record.items():
+                print(f"  {col}: {val}")
             
-            # 기본 정보
-            print(f"총 레코드 수: {len(df):,}")
-            print(f"컬럼 수: {len(df.columns)}")
-            print(f"컬럼 목록: {list(df.columns)}")
+            # 마지막 레코드 (마지막 row group만 읽음)
+            print(f"\n📍 마지막 레코드:")
+            last_group = pf.read_row_group(metadata.num_row_groups - 1)
+            last_record = last_group.slice(last_group.num_rows - 1, 1).to_pylist()[0]
+            for col, val in last_record.items():
+                print(f"  {col}: {val}")
             
-            if len(df) > 0:
-                # 첫 번째 레코드
-                print(f"\n📍 첫 번째 레코드:")
-                first_record = df.iloc[0]
-                for col, val in first_record.items():
-                    print(f"  {col}: {val}")
+            # 시간 범위 분석 (@timestamp가 있는 경우)
+            if '@timestamp' in columns:
+                ts_idx = columns.index('@timestamp')
+                ts_min, ts_max = _column_min_max(pf, ts_idx)
+                print(f"\n⏰ 시간 범위:")
+                print(f"  시작: {ts_min}")
+                print(f"  종료: {ts_max}")
                 
-                # 마지막 레코드  
-                print(f"\n📍 마지막 레코드:")
-                last_record = df.iloc[-1]
-                for col, val in last_record.items():
-                    print(f"  {col}: {val}")
-                
-                # 시간 범위 분석 (@timestamp가 있는 경우)
-                if '@timestamp' in df.columns:
-                    print(f"\n⏰ 시간 범위:")
-                    print(f"  시작: {df['@timestamp'].min()}")
-                    print(f"  종료: {df['@timestamp'].max()}")
-                    
-                    # 시간 순으로 정렬되어 있는지 확인
-                    df_sorted = df.sort_values('@timestamp')
-                    is_sorted = df['@timestamp'].equals(df_sorted['@timestamp'])
-                    print(f"  정렬 상태: {'✅ 정렬됨' if is_sorted else '❌ 정렬 안됨'}")
-                
-                # 중복 확인
-                duplicates = df.duplicated().sum()
-                print(f"\n🔍 데이터 품질:")
-                print(f"  중복 레코드: {duplicates:,}개")
-                print(f"  고유 레코드: {len(df) - duplicates:,}개")
-                
-                # 각 컬럼별 샘플 값들
-                print(f"\n📊 컬럼별 샘플 값:")
-                for col in df.columns:
-                    if col != '@timestamp':  # 타임스탬프는 이미 위에서 표시
-                        unique_vals = df[col].unique()
-                        if len(unique_vals) <= 5:
-                            print(f"  {col}: {list(unique_vals)}")
-                        else:
-                            print(f"  {col}: {list(unique_vals[:3])} ... (총 {len(unique_vals)}개 고유값)")
+                # 시간 순으로 정렬되어 있는지 확인 (@timestamp 컬럼만 읽음)
+                #   정렬 후 비교하지 않고 한 번 훑어서 단조 증가인지만 확인
+                ts = pf.read(columns=['@timestamp']).column(0).to_pandas()
+                is_sorted = ts.is_monotonic_increasing
+                print(f"  정렬 상태: {'✅ 정렬됨' if is_sorted else '❌ 정렬 안됨'}")
+            
+            # 중복 확인 (전체 행 비교라 모든 컬럼을 읽어야 함)
+            #   pandas 행 해시 대신 Arrow에서 행별 합성 키 문자열을 만들어 고유 개수를 셈
+            duplicates = num_rows - _count_distinct_rows(pf.read())
+            print(f"\n🔍 데이터 품질:")
+            print(f"  중복 레코드: {duplicates:,}개")
+            print(f"  고유 레코드: {num_rows - duplicates:,}개")
             
-            # 임시 파일 정리
-            os.unlink(tmp_file.name)
+            # 각 컬럼별 샘플 값들
+            print(f"\n📊 컬럼별 샘플 값:")
+            for col in columns:
+                if col != '@timestamp':  # 타임스탬프는 이미 위에서 표시
+                    unique_vals = sample_uniques(pf, col)
+                    if len(unique_vals) <= 5:
+                        print(f"  {col}: {unique_vals}")
+                    else:
+                        print(f"  {col}: {unique_vals[:3]} ... (고유값 5개 초과)")
             
     except Exception as e:
         print(f"❌ 파일 검사 실패: {e}")
@@ -10,25 +10,28 @@
 - 도커 컴포즈 환경 지원
 """
 
+import io
 import os
-import json
+import orjson
 import time
+import random
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
 import argparse
+import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
-from datetime import datetime, timedelta
+import pyarrow.compute as pc
+from datetime import datetime, timedelta, timezone
 from minio import Minio
 from minio.error import S3Error
-import tempfile
 import logging
-import threading
+import shutil
+import tempfile
 import schedule
-from concurrent.futures import ThreadPoolExecutor
-import hashlib
-import pytz
-from dateutil import parser as date_parser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 로깅 설정
 logging.basicConfig(
@@ -37,6 +40,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# MinIO 업로드 설정: 큰 파일(주간 파일)은 64MiB 파트를 8개씩 동시에 멀티파트 업로드
+UPLOAD_PART_SIZE = 64 * 1024 * 1024
+UPLOAD_PARALLEL_PARTS = 8
+
+# ES/MinIO가 응답하지 않을 때 무한정 기다리지 않도록 (connect, read) 타임아웃 지정
+# ES read는 쿼리 자체 timeout(60s)보다 조금 길게, MinIO는 64MiB 파트 업로드 응답을 기다릴 만큼
+ES_TIMEOUT = (3.05, 65)
+MINIO_TIMEOUT = urllib3.Timeout(connect=3.0, read=60)
+
+# KST는 서머타임이 없는 고정 UTC+9
+KST_OFFSET = timedelta(hours=9)
+
+# MinIO에 저장하는 @timestamp 컬럼 타입 (ES 원본이 ms 단위, KST)
+STORAGE_TIMESTAMP_TYPE = pa.timestamp('ms', tz='Asia/Seoul')
+
+# 값 종류가 적어서 Parquet dictionary 인코딩을 쓰는 컬럼
+DICTIONARY_COLUMNS = ['objId', 'rsctypeId']
+
+# KST 날짜 경계 계산용 (ms)
+KST_OFFSET_MS = 9 * 60 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+# 센서 값 한 건을 구분하는 키 (병합 시 같은 키는 마지막 행만 남김)
+DEDUP_KEYS = ['objId', '@timestamp']
+
+def _epoch_ms_to_iso(value):
+    """Unix timestamp(밀리초, 숫자 또는 숫자 문자열) -> ES 기본 형식의 ISO8601 UTC 문자열"""
+    utc_dt = datetime(1970, 1, 1) + timedelta(milliseconds=int(value))
+    return utc_dt.isoformat(timespec='milliseconds') + "Z"
+
+def write_json_atomic(path, data):
+    """임시 파일에 쓴 뒤 os.replace로 바꿔서, 쓰는 도중 중단돼도 체크포인트 파일이 깨지지 않게 저장"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        # 배치 체크포인트는 주차 번호(int)를 키로 쓰므로 OPT_NON_STR_KEYS 필요
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    os.replace(tmp_path, path)
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Streaming FTH Data Pipeline")
     
@@ -64,6 +105,10 @@ def parse_args():
     parser.add_argument("--target-month", 
         default="2025-06",
         help="Target month for batch processing")
+    parser.add_argument("--batch-workers",
+        type=int,
+        default=int(os.environ.get("BATCH_WORKERS", "4")),
+        help="Number of weeks processed concurrently in batch mode")
     parser.add_argument("--fields",
         default="TEMPERATURE,HUMIDITY,TEMPERATURE1,HUMIDITY1,objId,rsctypeId")
     
@@ -72,20 +117,42 @@ def parse_args():
 class StreamingPipeline:
     def __init__(self, args):
         self.args = args
+        # 배치 모드에서는 batch_workers개 주차가 동시에 ES 조회/멀티파트 업로드를 하므로 커넥션 풀도 그만큼 키움
+        # (풀보다 동시 요청이 많으면 urllib3가 연결을 버리고 새로 맺음)
+        week_workers = max(1, args.batch_workers) if args.mode == "batch" else 1
+        # minio 기본 http_client는 타임아웃이 5분이라 fail-fast 타임아웃을 준 PoolManager를 넘김
+        # (5xx만 짧게 재시도, 풀 크기는 주차별 병렬 멀티파트 업로드 + 다운로드 스레드 수 고려)
         self.minio_client = Minio(
             args.minio_endpoint,
             access_key=args.minio_access_key,
             secret_key=args.minio_secret_key,
-            secure=False
+            secure=False,
+            http_client=urllib3.PoolManager(
+                timeout=MINIO_TIMEOUT,
+                maxsize=max(16, week_workers * UPLOAD_PARALLEL_PARTS),
+                retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+            )
         )
         self.bucket_name = args.bucket_name
         self.es_url = args.es_url
+        
+        # ES 요청용 세션: scroll 페이지마다 연결을 새로 맺지 않고 keep-alive 연결을 재사용
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(8, week_workers))
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        # 요청 본문은 orjson으로 직접 직렬화해서 data=로 보냄
+        self.http.headers['Content-Type'] = 'application/json'
         self.index_pattern = args.index_pattern
         self.keep_fields = [f.strip() for f in args.fields.split(",")]
         
-        # 시간대 설정
-        self.utc_tz = pytz.UTC
-        self.kst_tz = pytz.timezone('Asia/Seoul')  # 한국 표준시
+        # ES 문서를 페이지 단위 컬럼(SoA)으로 모을 때 쓰는 Arrow 스키마
+        self._arrow_schema = self._build_arrow_schema()
+        # MinIO 저장/병합용 고정 스키마 (저장할 때마다 pandas dtype 추론에 맡기지 않음)
+        self._schema = pa.schema([
+            pa.field(f.name, STORAGE_TIMESTAMP_TYPE) if f.name == "@timestamp" else f
+            for f in self._arrow_schema
+        ])
         
         # 체크포인트 디렉토리 설정 (도커 볼륨 마운트 고려)
         self.checkpoint_dir = self._get_checkpoint_dir()
@@ -93,8 +160,11 @@ class StreamingPipeline:
         self._ensure_bucket()
         self._setup_checkpoint()
         
-        # 스레드풀 설정
-        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline")
+        # 스레드풀 설정 (스케줄러의 수집/병합 작업)
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline")
+        # 병합 시 분 단위 파일 동시 다운로드용 풀 (병합 작업이 자기가 도는 풀에 다운로드를 넣고 기다리면
+        # 병합 작업이 풀을 다 차지했을 때 다운로드가 실행되지 못해 멈추므로 따로 둠)
+        self.download_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="download")
         
         logger.info(f"Streaming pipeline initialized with KST timezone conversion")
         logger.info(f"Checkpoint directory: {self.checkpoint_dir}")
@@ -113,79 +183,100 @@ class StreamingPipeline:
             os.makedirs(checkpoint_dir, exist_ok=True)
             return checkpoint_dir
     
-    def convert_to_kst(self, utc_timestamp_str):
-        """UTC 시간 문자열을 KST로 변환"""
-        try:
-            # UTC 시간으로 파싱
-            if isinstance(utc_timestamp_str, str):
-                utc_dt = date_parser.parse(utc_timestamp_str)
+    def _build_arrow_schema(self):
+        """keep_fields + @timestamp(ES 원본 문자열)로 ES 수집용 Arrow 스키마 구성"""
+        fields = []
+        for name in self.keep_fields:
+            if name.startswith(("TEMPERATURE", "HUMIDITY")):
+                fields.append(pa.field(name, pa.float32()))  # 센서 값은 소수 첫째 자리 정도라 float32로 충분
+            elif name == "objId":
+                fields.append(pa.field(name, pa.int64()))
             else:
-                utc_dt = utc_timestamp_str
-            
-            # UTC 시간대 정보가 없으면 추가
-            if utc_dt.tzinfo is None:
-                utc_dt = self.utc_tz.localize(utc_dt)
-            
-            # KST로 변환
-            kst_dt = utc_dt.astimezone(self.kst_tz)
-            
-            return kst_dt
-        except Exception as e:
-            logger.error(f"Failed to convert timestamp {utc_timestamp_str}: {e}")
-            return None
-
+                fields.append(pa.field(name, pa.string()))
+        if "@timestamp" not in self.keep_fields:
+            fields.append(pa.field("@timestamp", pa.string()))
+        return pa.schema(fields)
+    
+    def _hits_to_batch(self, hits):
+        """ES hit 목록을 컬럼별 리스트로 모아서 RecordBatch 하나로 변환 (없는 필드는 null)"""
+        sources = [hit.get("_source", {}) for hit in hits]
+        arrays = []
+        for field in self._arrow_schema:
+            name = field.name
+            if pa.types.is_floating(field.type):
+                # 센서 값은 np.fromiter로 float32 배열을 바로 채움 (값이 없으면 NaN으로 넣고 Arrow에서 null로 변환)
+                values = np.fromiter(
+                    (np.nan if (v := src.get(name)) is None else v for src in sources),
+                    dtype=np.float32, count=len(sources)
+                )
+                arrays.append(pa.array(values, type=field.type, from_pandas=True))
+            else:
+                # 컬럼마다 리스트 컴프리헨션 한 번으로 모음 (hit × 필드마다 append 호출하지 않음)
+                values = [src.get(name) for src in sources]
+                if name == "@timestamp" and any(
+                        not isinstance(v, str) or v.isdigit() for v in values if v is not None):
+                    # @timestamp가 Unix timestamp(밀리초)로 들어온 문서는 ISO 문자열로 맞춰서
+                    # table_timestamps_to_kst에서 다른 문서와 같이 한 번에 파싱
+                    values = [
+                        v if v is None or (isinstance(v, str) and not v.isdigit()) else _epoch_ms_to_iso(v)
+                        for v in values
+                    ]
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self._arrow_schema)
+    
     def get_kst_now(self):
-        """현재 KST 시간 반환 (일관된 방법)"""
-        utc_now = datetime.utcnow()
-        kst_time = self.convert_to_kst(utc_now.isoformat() + 'Z')
-        return kst_time.replace(tzinfo=None) if kst_time else utc_now + timedelta(hours=9)
+        """현재 KST 시간 반환 (timezone-naive)"""
+        return datetime.utcnow() + KST_OFFSET
 
     def utc_to_kst_offset(self, utc_dt):
         """UTC 시간에 9시간 더해서 KST로 변환 (간단한 방법)"""
-        return utc_dt + timedelta(hours=9)
+        return utc_dt + KST_OFFSET
     
-    def process_dataframe_timestamps(self, df):
-        """DataFrame의 타임스탬프를 KST로 변환"""
-        if df.empty or '@timestamp' not in df.columns:
-            return df
-        
-        try:
-            df = df.copy()  # 원본 변경 방지
-            
-            # 원본 UTC 타임스탬프 백업
-            df['@timestamp_utc'] = df['@timestamp'].astype(str)
-            
-            # @timestamp가 Unix timestamp(밀리초)인지 ISO 문자열인지 확인
-            sample_timestamp = df['@timestamp'].iloc[0]
-            
-            if isinstance(sample_timestamp, (int, float)) or (isinstance(sample_timestamp, str) and sample_timestamp.isdigit()):
-                # Unix timestamp (밀리초) 처리
-                logger.debug("Processing Unix timestamp format")
-                df['@timestamp'] = pd.to_datetime(df['@timestamp'], unit='ms', utc=True)  
-            else:
-                # ISO 문자열 처리
-                logger.debug("Processing ISO string format")
-                df['@timestamp'] = pd.to_datetime(df['@timestamp'], utc=True)
-            
-            # KST로 변환 (UTC + 9시간)
-            df_kst = df['@timestamp'].dt.tz_convert('Asia/Seoul')
-            
-            # KST를 읽기 쉬운 문자열 형식으로 변환
-            df['@timestamp'] = df_kst.dt.strftime('%Y-%m-%d %H:%M:%S.%f').str[:-3]
-            
-            # 디버깅을 위한 샘플 출력
-            logger.debug(f"Sample conversions:")
-            logger.debug(f"  Original: {df['@timestamp_utc'].iloc[0]}")
-            logger.debug(f"  KST: {df['@timestamp'].iloc[0]}")
-            
-            logger.debug(f"Converted timestamps to KST for {len(df)} records")
-            
-            return df
-            
-        except Exception as e:
-            logger.error(f"Failed to process timestamps: {e}")
-            logger.error(f"Sample timestamp: {df['@timestamp'].iloc[0] if len(df) > 0 else 'No data'}")
-            return df
+    def normalize_loaded_timestamps(self, df):
+        """
+        MinIO에서 읽은 기존 파일의 @timestamp를 KST datetime으로 맞춤
+        이전 형식 파일은 @timestamp가 KST 문자열('%Y-%m-%d %H:%M:%S.%f')이고 @timestamp_utc 컬럼이 따로 있음
+        """
+        if '@timestamp_utc' in df.columns:
+            df = df.drop(columns=['@timestamp_utc'])
+        if '@timestamp' in df.columns and df['@timestamp'].dtype == object:
+            df['@timestamp'] = pd.to_datetime(df['@timestamp']).dt.tz_localize('Asia/Seoul')
+        return df
+    
+    def _conform_table(self, table):
+        """
+        Arrow 테이블의 컬럼 타입을 저장 스키마(self._schema)에 맞춤
+        (이전 형식 파일은 @timestamp가 문자열이고 센서 값이 float64라 그대로는 concat_tables가 안 됨)
+        """
+        if '@timestamp_utc' in table.column_names or (
+                '@timestamp' in table.column_names and pa.types.is_string(table.schema.field('@timestamp').type)):
+            # 이전 형식 파일은 드물어서 pandas로 한 번 변환
+            table = pa.Table.from_pandas(self.normalize_loaded_timestamps(table.to_pandas()), preserve_index=False)
+        for i, field in enumerate(table.schema):
+            if field.name not in self._schema.names:
+                continue
+            target = self._schema.field(field.name).type
+            if field.type != target:
+                table = table.set_column(i, field.name, table.column(i).cast(target))
+        return table
+    
+    @staticmethod
+    def drop_duplicate_readings(table):
+        """
+        (objId, @timestamp)가 같은 행은 마지막 행만 남김 (행 순서는 유지)
+        drop_duplicates(subset=DEDUP_KEYS, keep='last')와 같지만 pandas 변환 없이 Arrow 해시 그룹으로 처리
+        """
+        keys = [c for c in DEDUP_KEYS if c in table.column_names]
+        row_ids = table.append_column('_row', pa.array(np.arange(table.num_rows, dtype=np.int64)))
+        last_rows = row_ids.group_by(keys).aggregate([('_row', 'max')]).column('_row_max')
+        return table.take(last_rows.take(pc.sort_indices(last_rows)))
+    
+    @staticmethod
+    def drop_duplicates_sorted(table):
+        """(objId, @timestamp) 기준으로 중복 제거 후 @timestamp 순으로 정렬"""
+        unique = StreamingPipeline.drop_duplicate_readings(table)
+        # sort_indices는 안정 정렬이라 같은 시각이면 원래 순서가 유지됨
+        return unique.take(pc.sort_indices(unique, sort_keys=[('@timestamp', 'ascending')]))
     
     def _ensure_bucket(self):
         """버킷 생성"""
@@ -207,14 +298,13 @@ class StreamingPipeline:
                 "last_timestamp": one_hour_ago.isoformat() + "Z",
                 "last_processed_minute": None
             }
-            with open(self.checkpoint_file, 'w') as f:
-                json.dump(checkpoint, f)
+            write_json_atomic(self.checkpoint_file, checkpoint)
     
     def _load_checkpoint(self):
         """체크포인트 로드"""
         try:
-            with open(self.checkpoint_file, 'r') as f:
-                return json.load(f)
+            with open(self.checkpoint_file, 'rb') as f:
+                return orjson.loads(f.read())
         except Exception as e:
             logger.error(f"Failed to load checkpoint: {e}")
             return {"last_timestamp": (datetime.utcnow() - timedelta(hours=1)).isoformat() + "Z"}
@@ -222,8 +312,7 @@ class StreamingPipeline:
     def _save_checkpoint(self, checkpoint):
         """체크포인트 저장"""
         try:
-            with open(self.checkpoint_file, 'w') as f:
-                json.dump(checkpoint, f)
+            write_json_atomic(self.checkpoint_file, checkpoint)
         except Exception as e:
             logger.error(f"Failed to save checkpoint: {e}")
 
@@ -237,26 +326,76 @@ class StreamingPipeline:
                 return False
             raise
 
+    def _download_parquet_to_table(self, object_name):
+        """MinIO의 Parquet 객체를 임시 파일 없이 메모리로 받아서 병합용 Arrow 테이블로 읽음"""
+        response = self.minio_client.get_object(self.bucket_name, object_name)
+        try:
+            buf = io.BytesIO(response.read())
+        finally:
+            response.close()
+            response.release_conn()
+        return self._conform_table(pq.read_table(buf))
+    
+    def upload_table(self, object_name, table, **write_options):
+        """
+        Arrow 테이블을 메모리에서 Parquet으로 써서 임시 파일 없이 MinIO에 업로드
+        UPLOAD_PART_SIZE보다 큰 파일만 멀티파트로 나눠 병렬 업로드되고 작은 분 단위 파일은 한 번에 올라감
+        """
+        write_options.setdefault('use_dictionary', [c for c in DICTIONARY_COLUMNS if c in table.column_names])
+        buf = io.BytesIO()
+        pq.write_table(table, buf, **write_options)
+        buf.seek(0)
+        self.minio_client.put_object(
+            self.bucket_name,
+            object_name,
+            buf,
+            length=buf.getbuffer().nbytes,
+            part_size=UPLOAD_PART_SIZE,
+            num_parallel_uploads=UPLOAD_PARALLEL_PARTS,
+            content_type='application/octet-stream'
+        )
+    
     def load_parquet_safe(self, object_name):
-        """안전한 Parquet 파일 로드"""
-        with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
-            try:
-                self.minio_client.fget_object(self.bucket_name, object_name, tmp_file.name)
-                return pd.read_parquet(tmp_file.name)
-            finally:
-                if os.path.exists(tmp_file.name):
-                    os.unlink(tmp_file.name)
+        """안전한 Parquet 파일 로드 (저장 스키마에 맞춘 pa.Table)"""
+        return self._download_parquet_to_table(object_name)
+    
+    def table_timestamps_to_kst(self, table):
+        """
+        ES 조회 결과 pa.Table의 @timestamp(ISO8601 UTC 문자열, Unix timestamp 문서는 _hits_to_batch에서 변환됨)를
+        KST timestamp 컬럼으로 변환
+        pandas를 거치지 않고 Arrow cast로 한 번에 파싱 (UTC -> Asia/Seoul은 시간대 메타데이터만 바뀜)
+        """
+        i = table.schema.get_field_index('@timestamp')
+        ts = table.column(i).cast(pa.timestamp('ms', tz='UTC')).cast(STORAGE_TIMESTAMP_TYPE)
+        return table.set_column(i, '@timestamp', ts)
     
-    def fetch_elasticsearch_data_paginated(self, start_time, end_time, max_retries=5):
-        """Elasticsearch에서 모든 데이터를 Scroll API로 가져오기 (10,000개 제한 해결)"""
-        all_docs = []
+    def fetch_elasticsearch_data_paginated(self, start_time, end_time, max_retries=5, sink=None):
+        """
+        Elasticsearch에서 모든 데이터를 search_after로 가져오기 (10,000개 제한 해결)
+        (@timestamp, _id) 정렬의 마지막 sort 값을 다음 요청에 넘기므로 scroll과 달리 서버에 검색 컨텍스트가 남지 않음
+        페이지마다 RecordBatch로 바로 변환해서 모으고, (pa.Table, 전체 문서 수) 튜플로 반환
+        전체 문서 수는 첫 페이지 응답의 hits.total을 쓰므로 별도 count 조회가 필요 없음
+        
+        sink(open_spool_writer로 연 ParquetWriter)를 넘기면 페이지를 메모리에 모으지 않고 바로 파일에 쓰고
+        (가져온 문서 수, 전체 문서 수) 튜플을 반환
+        """
+        batches = []
+        fetched = 0
+        
+        def result():
+            if sink is not None:
+                return fetched, total_count or 0
+            return pa.Table.from_batches(batches, schema=self._arrow_schema), total_count or 0
         
         url = f"{self.es_url.rstrip('/')}/{self.index_pattern}/_search"
         
-        # 첫 번째 스크롤 요청
-        initial_query = {
-            "size": 1000,  # 스크롤에서는 더 큰 배치 크기 사용 가능
-            "sort": [{"@timestamp": {"order": "asc"}}],
+        query = {
+            "size": 10000,
+            # _id로 같은 타임스탬프 문서의 순서를 고정해야 페이지 사이에 누락/중복이 없음
+            "sort": [{"@timestamp": {"order": "asc"}}, {"_id": {"order": "asc"}}],
+            # keep_fields + @timestamp만 받아서 전송량과 JSON 파싱량을 줄임
+            "_source": self._arrow_schema.names,
+            "track_total_hits": True,  # 첫 페이지에서 정확한 전체 건수를 같이 받음
             "query": {
                 "bool": {
                     "must": [
@@ -277,17 +416,29 @@ class StreamingPipeline:
             "timeout": "60s"
         }
         
-        # Scroll 시작
-        scroll_url = url + "?scroll=2m"  # 2분 scroll timeout
+        total_count = None
+        batch_num = 0
         
-        for attempt in range(max_retries):
-            try:
-                resp = requests.post(scroll_url, json=initial_query, timeout=60)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                scroll_id = data.get("_scroll_id")
-                hits = data.get("hits", {}).get("hits", [])
+        while True:
+            # 페이지 단위로 재시도 (실패해도 처음부터 다시 읽지 않음)
+            for attempt in range(max_retries):
+                try:
+                    resp = self.http.post(url, data=orjson.dumps(query), timeout=ES_TIMEOUT)
+                    resp.raise_for_status()
+                    data = orjson.loads(resp.content)
+                    break
+                except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+                    if attempt == max_retries - 1:
+                        logger.error(f"All search attempts failed: {e}")
+                        return result()
+                    
+                    wait_time = min(2 ** attempt, 10)
+                    logger.warning(f"Search attempt {attempt + 1} failed, retrying in {wait_time}s: {e}")
+                    time.sleep(wait_time)
+            
+            hits = data.get("hits", {}).get("hits", [])
+            
+            if total_count is None:
                 total_hits = data.get("hits", {}).get("total", {})
                 
                 if isinstance(total_hits, dict):
@@ -295,174 +446,88 @@ class StreamingPipeline:
                 else:
                     total_count = total_hits
                 
-                logger.info(f"Started scroll: {len(hits)} records (total: {total_count})")
-                
-                if not hits:
-                    logger.info("No data found")
-                    return []
-                
-                # 첫 번째 배치 처리
-                page_docs = []
-                for hit in hits:
-                    source = hit.get("_source", {})
-                    filtered = {}
-                    for field in self.keep_fields:
-                        if field in source:
-                            filtered[field] = source[field]
-                    if "@timestamp" in source:
-                        filtered["@timestamp"] = source["@timestamp"]
-                    page_docs.append(filtered)
-                
-                all_docs.extend(page_docs)
-                batch_num = 1
-                
-                # 스크롤 계속
-                scroll_search_url = f"{self.es_url.rstrip('/')}/_search/scroll"
-                
-                while True:
-                    scroll_query = {
-                        "scroll": "2m",
-                        "scroll_id": scroll_id
-                    }
-                    
-                    try:
-                        scroll_resp = requests.post(scroll_search_url, json=scroll_query, timeout=60)
-                        scroll_resp.raise_for_status()
-                        scroll_data = scroll_resp.json()
-                        
-                        scroll_hits = scroll_data.get("hits", {}).get("hits", [])
-                        scroll_id = scroll_data.get("_scroll_id")  # 새로운 scroll_id 업데이트
-                        
-                        if not scroll_hits:
-                            logger.info(f"Scroll completed. Total fetched: {len(all_docs)} records")
-                            break
-                        
-                        batch_num += 1
-                        logger.info(f"Fetched batch {batch_num}: {len(scroll_hits)} records "
-                                   f"(progress: {len(all_docs)}/{total_count})")
-                        
-                        # 배치 데이터 처리
-                        batch_docs = []
-                        for hit in scroll_hits:
-                            source = hit.get("_source", {})
-                            filtered = {}
-                            for field in self.keep_fields:
-                                if field in source:
-                                    filtered[field] = source[field]
-                            if "@timestamp" in source:
-                                filtered["@timestamp"] = source["@timestamp"]
-                            batch_docs.append(filtered)
-                        
-                        all_docs.extend(batch_docs)
-                        
-                        # 진행률 출력 (매 10배치마다)
-                        if batch_num % 10 == 0:
-                            logger.info(f"Progress: Fetched {len(all_docs)} records so far...")
-                        
-                    except requests.exceptions.RequestException as e:
-                        logger.error(f"Scroll request failed: {e}")
-                        break
-                
-                # 스크롤 정리
-                try:
-                    if scroll_id:
-                        clear_url = f"{self.es_url.rstrip('/')}/_search/scroll"
-                        clear_query = {"scroll_id": [scroll_id]}
-                        requests.delete(clear_url, json=clear_query, timeout=10)
-                        logger.debug("Scroll context cleared")
-                except:
-                    pass  # 정리 실패해도 계속 진행
-                
-                return all_docs
-                
-            except requests.exceptions.RequestException as e:
-                if attempt == max_retries - 1:
-                    logger.error(f"All scroll attempts failed: {e}")
-                    return all_docs
-                
-                wait_time = min(2 ** attempt, 10)
-                logger.warning(f"Scroll attempt {attempt + 1} failed, retrying in {wait_time}s: {e}")
-                time.sleep(wait_time)
+                logger.info(f"Started search_after: {len(hits)} records (total: {total_count})")
+                # 전체 건수는 첫 페이지에서만 쓰므로 이후 페이지에서는 정확한 건수 계산 생략
+                query["track_total_hits"] = False
+            
+            if not hits:
+                break
+            
+            # 배치 데이터 처리
+            if sink is not None:
+                sink.write_batch(self._hits_to_batch(hits))
+            else:
+                batches.append(self._hits_to_batch(hits))
+            fetched += len(hits)
+            batch_num += 1
+            logger.info(f"Fetched batch {batch_num}: {len(hits)} records "
+                       f"(progress: {fetched}/{total_count})")
+            
+            if len(hits) < query["size"]:
+                break
+            
+            # 다음 페이지는 마지막 문서의 sort 값 뒤부터
+            query["search_after"] = hits[-1]["sort"]
         
-        return all_docs
+        logger.info(f"search_after completed. Total fetched: {fetched} records")
+        return result()
 
+    def open_spool_writer(self, path):
+        """ES 조회 결과를 페이지 단위로 바로 쓰는 로컬 Parquet 파일(ES 원본 스키마) 열기"""
+        return pq.ParquetWriter(path, self._arrow_schema, compression='snappy')
+    
     def fetch_elasticsearch_data(self, start_time, end_time):
-        """기존 호환성을 위한 래퍼 메서드"""
-        return self.fetch_elasticsearch_data_paginated(start_time, end_time)
+        """기존 호환성을 위한 래퍼 메서드 (pa.Table만 반환)"""
+        table, _ = self.fetch_elasticsearch_data_paginated(start_time, end_time)
+        return table
     
-    def save_minute_data(self, df, minute_timestamp):
-        """분 단위 데이터를 MinIO에 저장 (KST 시간 기준)"""
-        if df.empty:
+    def save_minute_data(self, table, minute_timestamp):
+        """분 단위 데이터(@timestamp를 KST로 변환한 pa.Table)를 MinIO에 저장 (KST 시간 기준)"""
+        if table.num_rows == 0:
             return None
         
-        # 시간대 변환 적용
-        df_processed = self.process_dataframe_timestamps(df)
-        
         # KST 기준으로 파일명 생성
-        kst_minute = self.convert_to_kst(minute_timestamp.isoformat() + 'Z')
-        if kst_minute is None:
-            kst_minute = minute_timestamp + timedelta(hours=9)  # fallback
-        else:
-            kst_minute = kst_minute.replace(tzinfo=None)  # timezone-naive로 변환
+        kst_minute = self.utc_to_kst_offset(minute_timestamp)
         
         minute_str = kst_minute.strftime("%Y%m%d_%H%M")
         object_name = f"realtime/rt_{minute_str}_kst.parquet"
         
-        with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
-            try:
-                df_processed.to_parquet(tmp_file.name, compression='snappy', index=False)
-                
-                self.minio_client.fput_object(
-                    self.bucket_name,
-                    object_name,
-                    tmp_file.name,
-                    content_type='application/octet-stream'
-                )
-                
-                logger.info(f"Saved {len(df_processed)} records to {object_name} (KST)")
-                return object_name
-                
-            finally:
-                if os.path.exists(tmp_file.name):
-                    os.unlink(tmp_file.name)
+        self.upload_table(object_name, table, compression='snappy')
+        
+        logger.info(f"Saved {table.num_rows} records to {object_name} (KST)")
+        return object_name
     
     def collect_current_minute_data(self):
         """이전 분의 데이터 수집 (데이터 누락 방지)"""
         # 현재 시간을 KST로 계산
         utc_now = datetime.utcnow()
-        kst_now = self.convert_to_kst(utc_now.isoformat() + 'Z')
-        
-        if kst_now is None:
-            kst_now = utc_now + timedelta(hours=9)  # fallback
-        else:
-            kst_now = kst_now.replace(tzinfo=None)  # timezone-naive로 변환
+        kst_now = utc_now + KST_OFFSET
         
         # 안전을 위해 이전 분의 데이터를 수집 (완전히 끝난 분)
         target_minute = kst_now.replace(second=0, microsecond=0) - timedelta(minutes=1)
         
         # UTC 기준으로 해당 분의 시작/끝 시간 계산
-        utc_minute_start = target_minute - timedelta(hours=9)  # KST -> UTC
+        utc_minute_start = target_minute - KST_OFFSET  # KST -> UTC
         utc_minute_end = utc_minute_start + timedelta(minutes=1)
         
         logger.info(f"Collecting data for KST minute: {target_minute} (1 minute ago)")
         logger.info(f"UTC range: {utc_minute_start.isoformat()}Z to {utc_minute_end.isoformat()}Z")
         
         # 해당 분의 데이터만 정확히 조회
-        docs = self.fetch_elasticsearch_data(
+        table = self.fetch_elasticsearch_data(
             utc_minute_start.isoformat() + "Z",
             utc_minute_end.isoformat() + "Z"
         )
         
-        if docs:
-            df = pd.DataFrame(docs)
-            if '@timestamp' in df.columns:
-                # KST로 변환
-                df_kst = self.process_dataframe_timestamps(df.copy())
+        if table.num_rows:
+            if '@timestamp' in table.column_names:
+                # KST로 변환 (pandas를 거치지 않고 Arrow에서 한 번만 파싱)
+                table_kst = self.table_timestamps_to_kst(table)
                 
-                logger.info(f"Found {len(df_kst)} records for KST minute {target_minute}")
+                logger.info(f"Found {table_kst.num_rows} records for KST minute {target_minute}")
                 
                 # 해당 분 데이터 저장 (KST 기준)
-                saved_file = self.save_minute_data(df_kst, target_minute)
+                saved_file = self.save_minute_data(table_kst, target_minute)
                 
                 # 체크포인트 업데이트 (UTC 기준)
                 checkpoint = self._load_checkpoint()
@@ -470,7 +535,7 @@ class StreamingPipeline:
                 checkpoint["last_processed_minute"] = target_minute.isoformat()
                 self._save_checkpoint(checkpoint)
                 
-                logger.info(f"Successfully processed {len(df_kst)} records for minute {target_minute}")
+                logger.info(f"Successfully processed {table_kst.num_rows} records for minute {target_minute}")
             else:
                 logger.warning("No @timestamp field in documents")
         else:
@@ -478,13 +543,7 @@ class StreamingPipeline:
     
     def merge_previous_minute_data(self):
         """이전 분의 데이터들을 병합 (KST 기준)"""
-        utc_now = datetime.utcnow()
-        kst_now = self.convert_to_kst(utc_now.isoformat() + 'Z')
-        
-        if kst_now is None:
-            kst_now = utc_now + timedelta(hours=9)
-        else:
-            kst_now = kst_now.replace(tzinfo=None)
+        kst_now = self.get_kst_now()
         
         # 이전 분 계산 (KST 기준, 안전을 위해 2분 전)
         target_minute = kst_now.replace(second=0, microsecond=0) - timedelta(minutes=2)
@@ -495,9 +554,9 @@ class StreamingPipeline:
         target_files = []
         
         try:
-            # 실시간 파일들 목록 조회 (KST 파일명 패턴)
-            for obj in self.minio_client.list_objects(self.bucket_name, prefix="realtime/"):
-                if f"rt_{minute_str}" in obj.object_name and "_kst.parquet" in obj.object_name:
+            # 실시간 파일들 목록 조회 (해당 분의 KST 파일명 prefix로 MinIO에서 바로 걸러서 받음)
+            for obj in self.minio_client.list_objects(self.bucket_name, prefix=f"realtime/rt_{minute_str}"):
+                if obj.object_name.endswith("_kst.parquet"):
                     target_files.append(obj.object_name)
         except Exception as e:
             logger.error(f"Failed to list objects: {e}")
@@ -509,79 +568,50 @@ class StreamingPipeline:
         
         logger.info(f"Merging {len(target_files)} KST files for minute {target_minute}")
         
-        # 파일들 로드 및 병합
-        dfs = []
+        # 파일들 로드 및 병합 (pandas를 거치지 않고 Arrow 테이블로 처리)
+        tables = []
         processed_files = []
         
-        for file_name in target_files:
+        # 파일마다 MinIO 요청 대기 시간이 있으므로 스레드풀에서 동시에 다운로드
+        futures = {
+            self.download_executor.submit(self._download_parquet_to_table, file_name): file_name
+            for file_name in target_files
+        }
+        for future in as_completed(futures):
+            file_name = futures[future]
             try:
-                with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
-                    self.minio_client.fget_object(self.bucket_name, file_name, tmp_file.name)
-                    df = pd.read_parquet(tmp_file.name)
-                    
-                    if not df.empty:
-                        dfs.append(df)
-                        processed_files.append(file_name)
-                    
-                    os.unlink(tmp_file.name)
+                table = future.result()
+                
+                if table.num_rows:
+                    tables.append(table)
+                    processed_files.append(file_name)
                     
             except Exception as e:
                 logger.error(f"Failed to process {file_name}: {e}")
                 continue
         
-        if dfs:
+        if tables:
             # 데이터 병합
-            merged_df = pd.concat(dfs, ignore_index=True)
-            merged_df = merged_df.drop_duplicates().sort_values('@timestamp')
+            merged = self.drop_duplicates_sorted(pa.concat_tables(tables, promote=True))
             
-            # 일일 파일명 (KST 날짜 기준)
-            daily_file = f"/daily/daily_{target_date.strftime('%Y%m%d')}_kst.parquet"
-            
-            # 기존 일일 파일이 있다면 함께 병합
-            try:
-                with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
-                    self.minio_client.fget_object(self.bucket_name, daily_file, tmp_file.name)
-                    existing_df = pd.read_parquet(tmp_file.name)
-                    
-                    # 기존 데이터와 합치기
-                    final_df = pd.concat([existing_df, merged_df], ignore_index=True)
-                    final_df = final_df.drop_duplicates().sort_values('@timestamp')
-                    os.unlink(tmp_file.name)
-                    
-            except S3Error as e:
-                if e.code == 'NoSuchKey':
-                    # 파일이 없으면 새로 생성
-                    final_df = merged_df
-                else:
-                    logger.error(f"Error accessing daily file: {e}")
-                    return
+            # 일일 데이터는 KST 날짜 prefix 아래에 분 단위 part 파일로 추가
+            # (기존 일일 데이터를 매분 다시 읽고 쓰지 않음, 같은 분을 다시 병합하면 같은 part 파일을 덮어씀)
+            daily_prefix = f"/daily/daily_{target_date.strftime('%Y%m%d')}_kst"
+            part_file = f"{daily_prefix}/part_{target_minute.strftime('%H%M')}.parquet"
             
             # 병합된 데이터 저장
-            with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
+            # 일일 데이터는 한 번 쓰고 여러 번 읽으므로 분 단위 파일(snappy)보다 압축률이 좋은 zstd 사용
+            self.upload_table(part_file, merged, compression='zstd', compression_level=3)
+            
+            logger.info(f"Merged {merged.num_rows} records into {part_file} (KST timezone)")
+            
+            # 성공적으로 병합된 실시간 파일들 삭제
+            for file_name in processed_files:
                 try:
-                    final_df.to_parquet(tmp_file.name, compression='snappy', index=False)
-                    
-                    self.minio_client.fput_object(
-                        self.bucket_name,
-                        daily_file,
-                        tmp_file.name,
-                        content_type='application/octet-stream'
-                    )
-                    
-                    logger.info(f"Merged {len(merged_df)} records into {daily_file} "
-                               f"(total: {len(final_df)} records, KST timezone)")
-                    
-                    # 성공적으로 병합된 실시간 파일들 삭제
-                    for file_name in processed_files:
-                        try:
-                            self.minio_client.remove_object(self.bucket_name, file_name)
-                            logger.debug(f"Removed merged KST file: {file_name}")
-                        except Exception as e:
-                            logger.warning(f"Failed to remove {file_name}: {e}")
-                    
-                finally:
-                    if os.path.exists(tmp_file.name):
-                        os.unlink(tmp_file.name)
+                    self.minio_client.remove_object(self.bucket_name, file_name)
+                    logger.debug(f"Removed merged KST file: {file_name}")
+                except Exception as e:
+                    logger.warning(f"Failed to remove {file_name}: {e}")
     
     def run_streaming_mode(self):
         """스트리밍 모드 실행"""
@@ -610,6 +640,7 @@ class StreamingPipeline:
             except KeyboardInterrupt:
                 logger.info("Shutting down...")
                 self.executor.shutdown(wait=True)
+                self.download_executor.shutdown(wait=True)
                 break
             except Exception as e:
                 logger.error(f"Error in main loop: {e}")
@@ -633,11 +664,14 @@ def process_batch_mode(args, pipeline):
     
     # 체크포인트 로드
     if os.path.exists(batch_checkpoint_file):
-        with open(batch_checkpoint_file, 'r') as f:
-            checkpoint = json.load(f)
+        with open(batch_checkpoint_file, 'rb') as f:
+            checkpoint = orjson.loads(f.read())
         completed_weeks = set(checkpoint.get("completed_weeks", []))
-        failed_weeks = checkpoint.get("failed_weeks", {})
-        partial_weeks = checkpoint.get("partial_weeks", {})
+        # JSON 객체 키는 문자열로 저장되므로 주차 번호(int)로 되돌림
+        failed_weeks = {int(k): v for k, v in checkpoint.get("failed_weeks", {}).items()}
+        partial_weeks = {int(k): v for k, v in checkpoint.get("partial_weeks", {}).items()}
+        checkpoint["failed_weeks"] = failed_weeks
+        checkpoint["partial_weeks"] = partial_weeks
         
         logger.info(f"Resuming from checkpoint:")
         logger.info(f"  - Completed weeks: {sorted(completed_weeks)}")
@@ -660,198 +694,80 @@ def process_batch_mode(args, pipeline):
     logger.info(f"Processing period: {start_date.date()} to {end_date.date()}")
     logger.info(f"Expected total weeks: {total_weeks_expected}")
     
+    # 처리할 주차 목록 (1주일 배치, 7일)
+    weeks = []
     while current_date < end_date:
-        # 1주일 배치 (7일)
         week_end = min(current_date + timedelta(days=7), end_date)
         
         # 이미 완료된 주차는 건너뛰기
         if week_num in completed_weeks:
             logger.info(f"Week {week_num} already completed, skipping...")
-            current_date = week_end
-            week_num += 1
-            continue
-        
-        # 실패한 주차 정보 표시
-        if week_num in failed_weeks:
-            failed_info = failed_weeks[week_num]
-            logger.warning(f"Week {week_num} previously failed {failed_info['attempts']} times. "
-                          f"Last error: {failed_info.get('last_error', 'Unknown')}")
-        
-        # 부분 완료된 주차 정보 표시
-        if week_num in partial_weeks:
-            partial_info = partial_weeks[week_num]
-            logger.info(f"Week {week_num} has partial data: {partial_info['current_count']}/{partial_info.get('expected_count', '?')} records")
-        
-        logger.info(f"Processing week {week_num}: {current_date.date()} to {(week_end - timedelta(days=1)).date()}")
-        
-        # 파일명 생성 (KST 기준)
-        start_str = current_date.strftime('%Y%m%d')
-        end_str = (week_end - timedelta(days=1)).strftime('%Y%m%d')
-        object_name = f"{args.target_month}/week_{week_num:02d}_{start_str}_{end_str}_kst.parquet"
-        
-        # 기존 파일이 있으면 현재 상황 확인
-        existing_record_count = 0
-        if pipeline.object_exists(object_name):
-            try:
-                existing_df = pipeline.load_parquet_safe(object_name)
-                existing_record_count = len(existing_df)
-                logger.info(f"Week {week_num} file already exists with {existing_record_count} records")
-            except Exception as e:
-                logger.warning(f"Could not load existing file: {e}, will create new file")
-        
-        # 먼저 전체 데이터 개수 확인 (한 번만 조회)
-        expected_count = 0
-        try:
-            logger.info("Checking expected data count...")
-            count_query = {
-                "size": 0,  # 실제 데이터는 가져오지 않고 카운트만
-                "query": {
-                    "bool": {
-                        "must": [
-                            {
-                                "range": {
-                                    "@timestamp": {
-                                        "gte": current_date.isoformat() + "Z",
-                                        "lt": week_end.isoformat() + "Z"
-                                    }
-                                }
-                            },
-                            {
-                                "term": {"rsctypeId": "FTH"}
-                            }
-                        ]
-                    }
-                }
-            }
-            
-            url = f"{pipeline.es_url.rstrip('/')}/{pipeline.index_pattern}/_search"
-            resp = requests.post(url, json=count_query, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
+        else:
+            # 실패한 주차 정보 표시
+            if week_num in failed_weeks:
+                failed_info = failed_weeks[week_num]
+                logger.warning(f"Week {week_num} previously failed {failed_info['attempts']} times. "
+                              f"Last error: {failed_info.get('last_error', 'Unknown')}")
             
-            total_hits = data.get("hits", {}).get("total", {})
-            if isinstance(total_hits, dict):
-                expected_count = total_hits.get("value", 0)
-            else:
-                expected_count = total_hits
-                
-            logger.info(f"Expected data count for week {week_num}: {expected_count}")
+            # 부분 완료된 주차 정보 표시
+            if week_num in partial_weeks:
+                partial_info = partial_weeks[week_num]
+                logger.info(f"Week {week_num} has partial data: {partial_info['current_count']}/{partial_info.get('expected_count', '?')} records")
             
-        except Exception as e:
-            logger.warning(f"Could not get expected count: {e}")
+            weeks.append((week_num, current_date, week_end))
         
-        # 여러 번 시도하여 모든 데이터 수집
-        max_attempts = 3
-        all_docs = []
-        attempt_successful = False
-        last_error = None
-        
-        for attempt in range(max_attempts):
-            logger.info(f"Attempt {attempt + 1}/{max_attempts} - Fetching data from {current_date.isoformat()}Z to {week_end.isoformat()}Z")
-            
+        current_date = week_end
+        week_num += 1
+    
+    # 주차마다 ES 조회/MinIO 저장 객체가 서로 겹치지 않으므로 최대 batch_workers개 주차를 동시에 처리
+    # 체크포인트 반영과 저장은 메인 스레드에서 끝난 주차 순서대로 하므로 별도 락이 필요 없음
+    max_workers = max(1, min(args.batch_workers, len(weeks)))
+    logger.info(f"Processing {len(weeks)} weeks with {max_workers} workers")
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as week_executor:
+        futures = {
+            week_executor.submit(process_one_week, args, pipeline, week_num, week_start, week_end): week_num
+            for week_num, week_start, week_end in weeks
+        }
+        for future in as_completed(futures):
+            week_num = futures[future]
             try:
-                docs = pipeline.fetch_elasticsearch_data_paginated(
-                    current_date.isoformat() + "Z",
-                    week_end.isoformat() + "Z"
-                )
-                
-                if docs:
-                    all_docs.extend(docs)
-                    logger.info(f"Attempt {attempt + 1}: Fetched {len(docs)} documents (total so far: {len(all_docs)})")
-                    
-                    # 기대하는 데이터 개수와 비교
-                    if expected_count > 0:
-                        fetch_ratio = len(all_docs) / expected_count
-                        logger.info(f"Data fetch progress: {len(all_docs)}/{expected_count} ({fetch_ratio:.1%})")
-                        
-                        # 80% 이상 가져왔으면 성공으로 간주
-                        if fetch_ratio >= 0.8:
-                            attempt_successful = True
-                            break
-                    else:
-                        # 예상 개수를 모르는 경우, 데이터가 있으면 성공으로 간주
-                        if len(all_docs) > 0:
-                            attempt_successful = True
-                            break
-                else:
-                    logger.warning(f"Attempt {attempt + 1}: No data returned")
-                
+                status, info = future.result()
             except Exception as e:
-                last_error = str(e)
-                logger.error(f"Attempt {attempt + 1} failed with error: {e}")
-            
-            if attempt < max_attempts - 1:
-                logger.info("Waiting 10 seconds before next attempt...")
-                time.sleep(10)  # 30초 -> 10초로 단축
-        
-        # 중복 제거
-        if all_docs:
-            # DataFrame으로 변환하여 중복 제거
-            temp_df = pd.DataFrame(all_docs)
-            all_docs = temp_df.drop_duplicates().to_dict('records')
-            logger.info(f"After deduplication: {len(all_docs)} unique documents for week {week_num}")
-        
-        # 결과 처리
-        if not attempt_successful and len(all_docs) == 0:
-            # 완전 실패
-            logger.error(f"Week {week_num} completely failed after {max_attempts} attempts")
-            failed_weeks[week_num] = {
-                "attempts": max_attempts,
-                "last_error": last_error or "No data retrieved",
-                "expected_count": expected_count,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # 체크포인트 업데이트
-            checkpoint["failed_weeks"] = failed_weeks
-            with open(batch_checkpoint_file, 'w') as f:
-                json.dump(checkpoint, f)
-            
-            logger.warning(f"Week {week_num} marked as failed and will be retried later")
-            
-        elif not attempt_successful and len(all_docs) > 0:
-            # 부분 성공
-            logger.warning(f"Week {week_num} partially successful: got {len(all_docs)}/{expected_count} records")
-            partial_weeks[week_num] = {
-                "current_count": len(all_docs) + existing_record_count,
-                "expected_count": expected_count,
-                "last_attempt": datetime.now().isoformat()
-            }
-            
-            # 체크포인트 업데이트
-            checkpoint["partial_weeks"] = partial_weeks
-            with open(batch_checkpoint_file, 'w') as f:
-                json.dump(checkpoint, f)
-            
-            # 부분 데이터라도 저장
-            process_and_save_week_data(pipeline, all_docs, week_num, current_date, week_end, 
-                                     object_name, existing_record_count, args.target_month)
-            
-        else:
-            # 성공
-            logger.info(f"Week {week_num} successfully completed: {len(all_docs)} documents")
+                logger.error(f"Week {week_num} failed with unexpected error: {e}")
+                status, info = "failed", {
+                    "attempts": 0,
+                    "last_error": str(e),
+                    "expected_count": 0,
+                    "timestamp": datetime.now().isoformat()
+                }
             
-            # 성공한 경우 실패/부분 완료 기록에서 제거
-            if week_num in failed_weeks:
-                del failed_weeks[week_num]
+            # 결과 처리
+            if status == "failed":
+                failed_weeks[week_num] = info
                 checkpoint["failed_weeks"] = failed_weeks
-            if week_num in partial_weeks:
-                del partial_weeks[week_num]
+                logger.warning(f"Week {week_num} marked as failed and will be retried later")
+            elif status == "partial":
+                partial_weeks[week_num] = info
                 checkpoint["partial_weeks"] = partial_weeks
-            
-            # 데이터 처리 및 저장
-            if process_and_save_week_data(pipeline, all_docs, week_num, current_date, week_end, 
-                                        object_name, existing_record_count, args.target_month):
+            else:
+                # 성공한 경우 실패/부분 완료 기록에서 제거
+                if week_num in failed_weeks:
+                    del failed_weeks[week_num]
+                    checkpoint["failed_weeks"] = failed_weeks
+                if week_num in partial_weeks:
+                    del partial_weeks[week_num]
+                    checkpoint["partial_weeks"] = partial_weeks
                 # 성공한 주차를 체크포인트에 추가
-                completed_weeks.add(week_num)
-                checkpoint["completed_weeks"] = list(completed_weeks)
-                with open(batch_checkpoint_file, 'w') as f:
-                    json.dump(checkpoint, f)
-                
+                # (조회는 성공했지만 저장할 데이터가 없거나 저장에 실패한 경우(not_saved)는 완료로 치지 않음)
+                if status == "completed":
+                    completed_weeks.add(week_num)
+                    checkpoint["completed_weeks"] = list(completed_weeks)
+            
+            # 주차가 끝날 때마다 한 번 저장
+            write_json_atomic(batch_checkpoint_file, checkpoint)
+            if status == "completed":
                 logger.info(f"Week {week_num} completed and checkpointed")
-        
-        current_date = week_end
-        week_num += 1
     
     # 배치 처리 완료 후 요약
     logger.info("="*60)
@@ -885,97 +801,228 @@ def process_batch_mode(args, pipeline):
         except:
             pass
 
+def process_one_week(args, pipeline, week_num, current_date, week_end):
+    """
+    한 주차 [current_date, week_end)(UTC) 조회 -> 중복 제거 -> KST 날짜별 저장
+    다른 주차와 저장 객체가 겹치지 않아 여러 스레드에서 동시에 실행 가능 (체크포인트는 건드리지 않음)
+    반환값: (status, info)
+      status: "completed" / "partial" / "failed" / "not_saved"(조회는 성공했지만 저장된 데이터 없음)
+      info: failed/partial일 때 체크포인트에 기록할 내용
+    """
+    logger.info(f"Processing week {week_num}: {current_date.date()} to {(week_end - timedelta(days=1)).date()}")
+    
+    # 파일명 생성 (KST 날짜별 Hive 파티션)
+    partition_objects = week_partition_objects(args.target_month, week_num, current_date, week_end)
+    
+    # 기존 파일이 있으면 현재 상황 확인
+    existing_record_count = 0
+    for object_name in partition_objects.values():
+        if pipeline.object_exists(object_name):
+            try:
+                existing_record_count += len(pipeline.load_parquet_safe(object_name))
+            except Exception as e:
+                logger.warning(f"Could not load existing file {object_name}: {e}, will create new file")
+    if existing_record_count > 0:
+        logger.info(f"Week {week_num} files already exist with {existing_record_count} records")
+    
+    # 전체 데이터 개수는 첫 번째 조회 응답의 hits.total로 확인 (별도 count 조회 없음)
+    expected_count = 0
+    
+    # 여러 번 시도하여 모든 데이터 수집
+    # 가져온 페이지는 메모리에 모으지 않고 주차별 로컬 Parquet 파일(spool)에 바로 씀
+    max_attempts = 3
+    spool_dir = tempfile.mkdtemp(prefix=f"week_{week_num:02d}_")
+    spool_path = os.path.join(spool_dir, f"week_{week_num:02d}.parquet")
+    spool = pipeline.open_spool_writer(spool_path)
+    fetched_count = 0
+    attempts_made = 0
+    attempt_successful = False
+    last_error = None
+    
+    for attempt in range(max_attempts):
+        attempts_made += 1
+        logger.info(f"Attempt {attempt + 1}/{max_attempts} - Fetching data from {current_date.isoformat()}Z to {week_end.isoformat()}Z")
+        
+        try:
+            fetched, total_count = pipeline.fetch_elasticsearch_data_paginated(
+                current_date.isoformat() + "Z",
+                week_end.isoformat() + "Z",
+                sink=spool
+            )
+            if not expected_count and total_count:
+                expected_count = total_count
+                logger.info(f"Expected data count for week {week_num}: {expected_count}")
+            
+            if fetched:
+                fetched_count += fetched
+                logger.info(f"Attempt {attempt + 1}: Fetched {fetched} documents (total so far: {fetched_count})")
+                
+                # 기대하는 데이터 개수와 비교
+                if expected_count > 0:
+                    fetch_ratio = fetched_count / expected_count
+                    logger.info(f"Data fetch progress: {fetched_count}/{expected_count} ({fetch_ratio:.1%})")
+                    
+                    # 80% 이상 가져왔으면 성공으로 간주
+                    if fetch_ratio >= 0.8:
+                        attempt_successful = True
+                        break
+                else:
+                    # 예상 개수를 모르는 경우, 데이터가 있으면 성공으로 간주
+                    if fetched_count > 0:
+                        attempt_successful = True
+                        break
+            else:
+                logger.warning(f"Attempt {attempt + 1}: No data returned")
+            
+        except Exception as e:
+            last_error = str(e)
+            logger.error(f"Attempt {attempt + 1} failed with error: {e}")
+        
+        if attempt < max_attempts - 1:
+            # 지수 백오프(10s, 20s, ... 최대 60s) + 지터: 여러 배치가 같은 간격으로 ES에 재시도하지 않도록 분산
+            wait_time = min(60, 10 * 2 ** attempt) + random.uniform(0, 2)
+            logger.info(f"Waiting {wait_time:.1f} seconds before next attempt...")
+            time.sleep(wait_time)
+    
+    # 중복 제거
+    spool.close()
+    all_docs = pa.table({})
+    try:
+        if fetched_count and attempts_made > 1:
+            # 모든 시도의 결과가 spool 파일 하나에 있으므로 한 번에 읽어서
+            # (objId, @timestamp) 해시 기준으로 중복 제거 (이후 저장까지 pandas로 변환하지 않음)
+            all_docs = pipeline.drop_duplicate_readings(pq.read_table(spool_path))
+            logger.info(f"After deduplication: {len(all_docs)} unique documents for week {week_num}")
+        elif fetched_count:
+            # 한 번의 search_after 조회는 (@timestamp, _id) 순으로 문서를 한 번씩만 읽으므로 중복 제거 생략
+            all_docs = pq.read_table(spool_path)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    
+    # 결과 처리
+    if not attempt_successful and len(all_docs) == 0:
+        # 완전 실패
+        logger.error(f"Week {week_num} completely failed after {max_attempts} attempts")
+        return "failed", {
+            "attempts": max_attempts,
+            "last_error": last_error or "No data retrieved",
+            "expected_count": expected_count,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    if not attempt_successful:
+        # 부분 성공
+        logger.warning(f"Week {week_num} partially successful: got {len(all_docs)}/{expected_count} records")
+        
+        # 부분 데이터라도 저장
+        process_and_save_week_data(pipeline, all_docs, week_num, current_date, week_end, 
+                                 partition_objects, existing_record_count, args.target_month)
+        return "partial", {
+            "current_count": len(all_docs) + existing_record_count,
+            "expected_count": expected_count,
+            "last_attempt": datetime.now().isoformat()
+        }
+    
+    # 성공
+    logger.info(f"Week {week_num} successfully completed: {len(all_docs)} documents")
+    
+    # 데이터 처리 및 저장
+    if process_and_save_week_data(pipeline, all_docs, week_num, current_date, week_end, 
+                                partition_objects, existing_record_count, args.target_month):
+        return "completed", None
+    return "not_saved", None
+
+def week_partition_objects(target_month, week_num, current_date, week_end):
+    """
+    주차 구간 [current_date, week_end)(UTC)가 걸치는 KST 날짜별 저장 객체 이름 {'YYYY-MM-DD': object_name}
+    {target_month}/kst_date=YYYY-MM-DD/ 형태의 Hive 파티션이라 읽는 쪽에서 날짜 조건으로 파일을 건너뛸 수 있음
+    (KST 날짜 하나가 두 주차에 걸치므로 파일명에 주차 번호를 넣어 구분)
+    """
+    first_day = (current_date + KST_OFFSET).date()
+    last_day = (week_end + KST_OFFSET - timedelta(microseconds=1)).date()
+    objects = {}
+    day = first_day
+    while day <= last_day:
+        kst_date = day.strftime('%Y-%m-%d')
+        objects[kst_date] = f"{target_month}/kst_date={kst_date}/week_{week_num:02d}_kst.parquet"
+        day += timedelta(days=1)
+    return objects
+
+def _utc_epoch_ms(utc_dt):
+    """timezone-naive UTC datetime -> epoch ms"""
+    return int(utc_dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
 def process_and_save_week_data(pipeline, all_docs, week_num, current_date, week_end, 
-                              object_name, existing_record_count, target_month):
-    """주차 데이터 처리 및 저장 (공통 함수)"""
-    if not all_docs:
+                              partition_objects, existing_record_count, target_month):
+    """
+    주차 데이터 처리 및 KST 날짜별 파티션 저장 (공통 함수, all_docs는 중복 제거된 ES 조회 결과 pa.Table)
+    pandas로 변환하지 않고 Arrow 테이블 그대로 시간 변환/주차 필터/날짜 분할/병합 후 저장
+    """
+    if all_docs.num_rows == 0:
         logger.info(f"No new data to process for week {week_num}")
         return False
     
     try:
-        # DataFrame 생성 및 시간대 변환
-        df = pd.DataFrame(all_docs)
-        logger.info(f"Created DataFrame with {len(df)} rows and columns: {list(df.columns)}")
+        logger.info(f"Processing {all_docs.num_rows} rows with columns: {all_docs.column_names}")
         
-        new_record_count = len(df)  # 새로 가져온 데이터 개수 저장
+        new_record_count = all_docs.num_rows  # 새로 가져온 데이터 개수 저장
         
-        if '@timestamp' in df.columns:
-            # 시간 변환 전 샘플 확인
-            logger.info(f"Sample original timestamps: {df['@timestamp'].head(3).tolist()}")
-            
-            df = pipeline.process_dataframe_timestamps(df)
-            logger.info(f"After timezone conversion: {len(df)} records")
-            
-            # 시간 변환 후 샘플 확인  
-            logger.info(f"Sample KST timestamps: {df['@timestamp'].head(3).tolist() if len(df) > 0 else 'No data'}")
-            if '@timestamp_utc' in df.columns:
-                logger.info(f"Sample UTC timestamps: {df['@timestamp_utc'].head(3).tolist()}")
-            logger.info(f"Full time range: {df['@timestamp'].min()} to {df['@timestamp'].max()} (KST)")
-            
-            # 해당 주차에 속하는 데이터만 필터링 (KST 기준)
-            week_start_kst = pipeline.utc_to_kst_offset(current_date)
-            week_end_kst = pipeline.utc_to_kst_offset(week_end)
-            
-            logger.info(f"Week filter range: {week_start_kst} to {week_end_kst} (KST)")
-            
-            # pandas datetime 변환 및 필터링 - 문자열을 다시 datetime으로 변환
-            df['@timestamp_dt'] = pd.to_datetime(df['@timestamp'])
-            week_start_dt = pd.to_datetime(week_start_kst)
-            week_end_dt = pd.to_datetime(week_end_kst)
-            
-            week_df = df[
-                (df['@timestamp_dt'] >= week_start_dt) & 
-                (df['@timestamp_dt'] < week_end_dt)
-            ].copy()
-            
-            # 임시 컬럼 제거
-            week_df = week_df.drop(columns=['@timestamp_dt'])
-            
-            logger.info(f"After week filtering: {len(week_df)} records for week {week_num}")
-            if len(week_df) > 0:
-                logger.info(f"Week time range: {week_df['@timestamp'].min()} to {week_df['@timestamp'].max()} (KST)")
-            
-            if len(week_df) == 0:
-                logger.warning(f"No data in target week range after filtering")
-                return False
-            
-            final_df = week_df
-        else:
-            logger.warning("No @timestamp field in documents")
-            final_df = df
+        # 시간 변환 전 샘플 확인
+        logger.info(f"Sample original timestamps: {all_docs.column('@timestamp').slice(0, 3).to_pylist()}")
+        
+        # 시간대 변환 후 시간순 정렬
+        table = pipeline.table_timestamps_to_kst(all_docs)
+        table = table.take(pc.sort_indices(table, sort_keys=[('@timestamp', 'ascending')]))
+        
+        # 정렬된 epoch ms 배열에서 이진 탐색으로 구간 위치를 찾아 slice (복사 없음)
+        ts_ms = pc.fill_null(table.column('@timestamp').cast(pa.int64()), np.iinfo(np.int64).max).to_numpy()
+        
+        time_range = pc.min_max(table.column('@timestamp')).as_py()
+        logger.info(f"Full time range: {time_range['min']} to {time_range['max']} (KST)")
+        
+        # 해당 주차에 속하는 데이터만 필터링 (UTC 주차 경계 = KST 주차 경계 - 9시간)
+        week_start_kst = pipeline.utc_to_kst_offset(current_date)
+        week_end_kst = pipeline.utc_to_kst_offset(week_end)
+        logger.info(f"Week filter range: {week_start_kst} to {week_end_kst} (KST)")
+        
+        lo, hi = np.searchsorted(ts_ms, [_utc_epoch_ms(current_date), _utc_epoch_ms(week_end)], side='left')
+        
+        logger.info(f"After week filtering: {hi - lo} records for week {week_num}")
+        if hi == lo:
+            logger.warning(f"No data in target week range after filtering")
+            return False
         
-        # 기존 파일과 병합 처리
         if existing_record_count > 0:
             logger.info(f"Merging with existing {existing_record_count} records")
-            try:
-                existing_df = pipeline.load_parquet_safe(object_name)
-                # 기존 데이터와 새 데이터 합치기
-                combined_df = pd.concat([existing_df, final_df], ignore_index=True)
-                # 중복 제거 (전체 행 기준)
-                final_df = combined_df.drop_duplicates().sort_values('@timestamp')
-                
-                logger.info(f"Merged: {existing_record_count} existing + {new_record_count} new = {len(final_df)} final records")
-            except Exception as e:
-                logger.error(f"Failed to merge with existing file: {e}, using new data only")
         
-        # MinIO에 저장
-        with tempfile.NamedTemporaryFile(suffix='.parquet', delete=False) as tmp_file:
-            try:
-                final_df.to_parquet(tmp_file.name, compression='snappy', index=False)
-                
-                pipeline.minio_client.fput_object(
-                    pipeline.bucket_name,
-                    object_name,
-                    tmp_file.name,
-                    content_type='application/octet-stream'
-                )
-                
-                logger.info(f"Saved {len(final_df)} records to {object_name}")
-                return True
-                
-            finally:
-                if os.path.exists(tmp_file.name):
-                    os.unlink(tmp_file.name)
+        # KST 날짜별로 나눠서 파티션마다 저장 (날짜는 경로에 있으므로 컬럼으로는 저장하지 않음)
+        saved_count = 0
+        for kst_date, object_name in partition_objects.items():
+            # KST 자정의 epoch ms
+            day_start = _utc_epoch_ms(datetime.strptime(kst_date, '%Y-%m-%d')) - KST_OFFSET_MS
+            day_lo, day_hi = np.searchsorted(ts_ms[lo:hi], [day_start, day_start + DAY_MS], side='left')
+            if day_hi == day_lo:
+                continue
+            day_table = table.slice(lo + day_lo, day_hi - day_lo)
+            
+            # 기존 파일과 병합 처리
+            if existing_record_count > 0 and pipeline.object_exists(object_name):
+                try:
+                    existing = pipeline.load_parquet_safe(object_name)
+                    # 기존 데이터와 새 데이터 합치기, (objId, @timestamp) 기준 중복 제거 (새 데이터 우선)
+                    day_table = pipeline.drop_duplicates_sorted(pa.concat_tables([existing, day_table], promote=True))
+                except Exception as e:
+                    logger.error(f"Failed to merge with existing file {object_name}: {e}, using new data only")
+            
+            # MinIO에 저장
+            # 배치 결과는 한 번 쓰고 여러 번 읽으므로 zstd(level 3), objId/rsctypeId는 upload_table 기본값대로 dictionary 인코딩
+            pipeline.upload_table(object_name, day_table, compression='zstd', compression_level=3,
+                                  row_group_size=256_000)
+            saved_count += day_table.num_rows
+            logger.info(f"Saved {day_table.num_rows} records to {object_name}")
+        
+        logger.info(f"Week {week_num}: {existing_record_count} existing + {new_record_count} new = {saved_count} final records")
+        return True
     
     except Exception as e:
         logger.error(f"Failed to process and save week {week_num} data: {e}")
@@ -14,13 +14,26 @@ docker run 예시:
 """
 
 import os
-import json
+import orjson
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import argparse
 from datetime import datetime
 from kafka import KafkaProducer
 
+# ES 폴링용 세션: 매 요청마다 연결을 새로 맺지 않고 keep-alive 연결을 재사용
+# (재시도는 서킷 브레이커/폴링 주기에 맡기고 어댑터에서는 하지 않음)
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=0))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers["Content-Type"] = "application/json"
+
+# ES 요청 타임아웃 (연결, 응답 읽기) 초
+ES_TIMEOUT = (3.05, 30)
+
 def parse_args():
     parser = argparse.ArgumentParser(description="FTH (Temp/Hum) Data to Kafka")
     parser.add_argument("--es-url", 
@@ -64,35 +77,77 @@ def parse_args():
     )
     return parser.parse_args()
 
-def load_checkpoint(checkpoint_file: str, default_ts: str) -> str:
+def load_checkpoint(checkpoint_file: str, default_ts: str) -> tuple:
+    """
+    반환값: (마지막으로 보낸 문서의 @timestamp, 그 문서의 sort 값 [@timestamp, _id])
+    이전 형식 체크포인트(last_timestamp만 있음)나 체크포인트가 없으면 sort 값은 None
+    """
     if not os.path.exists(checkpoint_file):
-        return default_ts
-    with open(checkpoint_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
-        return data.get("last_timestamp", default_ts)
+        return default_ts, None
+    with open(checkpoint_file, "rb") as f:
+        data = orjson.loads(f.read())
+        return data.get("last_timestamp", default_ts), data.get("search_after")
+
+def save_checkpoint(checkpoint_file: str, last_ts: str, search_after: list = None):
+    data = {"last_timestamp": last_ts, "search_after": search_after}
+    with open(checkpoint_file, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+class CircuitOpen(Exception):
+    """서킷이 열려 있어서 ES 요청을 보내지 않았음"""
+
+class CircuitBreaker:
+    """
+    ES 요청이 failure_threshold번 연속 실패하면 서킷을 열고 reset_timeout초 동안 요청을 보내지 않음 (open)
+    reset_timeout이 지나면 한 번 시도해보고(half-open) 성공하면 닫고, 실패하면 다시 연다
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
 
-def save_checkpoint(checkpoint_file: str, last_ts: str):
-    data = {"last_timestamp": last_ts}
-    with open(checkpoint_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    def call(self, func, *args, **kwargs):
+        if self.opened_at is not None:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpen(f"ES circuit open after {self.failures} consecutive failures, "
+                                  f"retry in {remaining:.0f}s")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.failures += 1
+            # half-open 상태에서 실패했거나 연속 실패가 기준 이상이면 (다시) 연다
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            raise
+        self.failures = 0
+        self.opened_at = None
+        return result
 
-def fetch_new_docs(es_url: str, index_pattern: str, since_timestamp: str, size: int = 500) -> list:
+def fetch_new_docs(es_url: str, index_pattern: str, since_timestamp: str, size: int = 500,
+                   fields: list = None, search_after: list = None) -> tuple:
     """
     FTH(rsctypeId=FTH) 문서만 가져오기 위해 bool 쿼리로 @timestamp + term(rsctypeId='FTH') 필터.
+    (@timestamp, _id) 정렬 + search_after로 한 페이지씩 가져오므로 같은 @timestamp 문서가 페이지 경계에서 빠지지 않음
+    search_after가 있으면 since_timestamp와 같은 시각의 남은 문서도 받아야 하므로 gte, 없으면 gt로 조회
+    반환값: (문서 목록, 다음 페이지 요청에 넘길 search_after 값)
     """
     url = f"{es_url.rstrip('/')}/{index_pattern}/_search"
     query_body = {
         "size": size,
         "sort": [
-            {"@timestamp": {"order": "asc"}}
+            {"@timestamp": {"order": "asc"}},
+            {"_id": {"order": "asc"}}
         ],
+        "track_total_hits": False,  # 전체 건수는 쓰지 않으므로 집계 생략
         "query": {
             "bool": {
                 "must": [
                     {
                         "range": {
                             "@timestamp": {
-                                "gt": since_timestamp
+                                ("gte" if search_after is not None else "gt"): since_timestamp
                             }
                         }
                     },
@@ -105,32 +160,18 @@ def fetch_new_docs(es_url: str, index_pattern: str, since_timestamp: str, size:
             }
         }
     }
-    resp = requests.post(url, json=query_body)
+    if fields:
+        # --fields 를 지정한 경우 ES에서 필요한 필드만 받음
+        query_body["_source"] = {"includes": list(dict.fromkeys([*fields, "@timestamp"]))}
+    if search_after is not None:
+        query_body["search_after"] = search_after
+    resp = SESSION.post(url, data=orjson.dumps(query_body), timeout=ES_TIMEOUT)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
     
     hits = data.get("hits", {}).get("hits", [])
-    docs = []
-    for h in hits:
-        src = h.get("_source", {})
-        docs.append(src)
-    return docs
-
-def filter_fields(doc: dict, keep_fields: list) -> dict:
-    """
-    --fields 를 지정한 경우 그 필드만 추출.
-    """
-    if not keep_fields:
-        return doc  # 필드 목록이 비어있으면 전체 전달
-    
-    filtered = {}
-    for field in keep_fields:
-        if field in doc:
-            filtered[field] = doc[field]
-    # @timestamp는 항상 포함하고 싶다면:
-    if "@timestamp" not in filtered and "@timestamp" in doc:
-        filtered["@timestamp"] = doc["@timestamp"]
-    return filtered
+    docs = [h.get("_source", {}) for h in hits]
+    return docs, (hits[-1]["sort"] if hits else search_after)
 
 # base_schema: TEMPERATURE, HUMIDITY, TEMPERATURE1, HUMIDITY1, objId, rsctypeId, ...
 base_schema = {
@@ -143,23 +184,31 @@ base_schema = {
     "HUMIDITY1": None
 }
 
-def apply_base_schema(doc: dict, base_schema: dict) -> dict:
-    new_doc = dict(base_schema)
-    for k, v in doc.items():
-        if k in new_doc:
-            new_doc[k] = v
-    return new_doc
+def make_unified_fields(keep_fields: list) -> tuple:
+    """
+    base_schema 필드 중 문서에서 값을 채울 필드 목록 (시작할 때 한 번만 계산)
+    --fields 를 지정한 경우 그 필드와 @timestamp만, 비어있으면 base_schema 전체
+    """
+    if not keep_fields:
+        return tuple(base_schema)
+    keep = set(keep_fields) | {"@timestamp"}
+    return tuple(k for k in base_schema if k in keep)
 
-def is_effectively_empty(doc: dict) -> bool:
+def build_unified_doc(doc: dict, unified_fields: tuple):
     """
-    @timestamp 외에 전부 None이면 True
+    --fields 필터 + base_schema 적용 + 빈 문서 확인을 한 번에 처리
+    (문서마다 중간 dict를 만들지 않고 base_schema 복사본 하나만 채움)
+    @timestamp 외에 전부 None이면 None 반환
     """
-    for k, v in doc.items():
-        if k == "@timestamp":
-            continue
+    unified = dict(base_schema)
+    empty = True
+    for k in unified_fields:
+        v = doc.get(k)
         if v is not None:
-            return False
-    return True
+            unified[k] = v
+            if k != "@timestamp":
+                empty = False
+    return None if empty else unified
 
 def main():
     args = parse_args()
@@ -180,50 +229,76 @@ def main():
         keep_fields = []
     
     # Kafka Producer
-    producer = KafkaProducer(bootstrap_servers=kafka_brokers)
+    # send()는 내부 버퍼에 쌓기만 하고, linger_ms 동안 모인 문서를 batch_size 단위 lz4 압축 배치로 전송
+    producer = KafkaProducer(
+        bootstrap_servers=kafka_brokers,
+        linger_ms=50,
+        batch_size=131072,
+        compression_type="lz4",
+        acks=1,
+        value_serializer=orjson.dumps  # dict -> UTF-8 JSON bytes (C 확장)
+    )
+    
+    # ES가 계속 실패하면 잠시 요청을 멈추는 서킷 브레이커
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    
+    # 문서마다 채울 base_schema 필드
+    unified_fields = make_unified_fields(keep_fields)
     
     # 체크포인트 로드
-    last_timestamp = load_checkpoint(checkpoint_file, default_start_ts)
-    print(f"[INFO] Loaded last timestamp from checkpoint: {last_timestamp}")
+    last_timestamp, last_sort = load_checkpoint(checkpoint_file, default_start_ts)
+    print(f"[INFO] Loaded last timestamp from checkpoint: {last_timestamp} (search_after: {last_sort})")
     
     while True:
         try:
-            # 1) FTH 문서만 가져오기
-            new_docs = fetch_new_docs(es_url, index_pattern, last_timestamp, size=fetch_size)
-            if not new_docs:
-                print("[INFO] No new FTH documents found.")
-            else:
-                print(f"[INFO] Fetched {len(new_docs)} new FTH documents.")
+            # 1) FTH 문서만 가져오기 (마지막 체크포인트 이후 문서를 search_after로 끝까지)
+            #    조회 조건(since)은 고정하고 페이지 위치는 search_after로 이어감
+            #    체크포인트의 sort 값(@timestamp, _id)에서 이어가므로 마지막으로 보낸 문서와
+            #    같은 @timestamp의 남은 문서도 빠지지 않음
+            fetched = 0
+            since = last_timestamp
+            local_max_ts = last_timestamp
+            search_after = last_sort
+            while True:
+                new_docs, search_after = breaker.call(
+                    fetch_new_docs, es_url, index_pattern, since,
+                    size=fetch_size, fields=keep_fields, search_after=search_after
+                )
+                fetched += len(new_docs)
                 
-                local_max_ts = last_timestamp
                 for doc in new_docs:
                     doc_ts = doc.get("@timestamp")
 
-                    # --fields 필터
-                    filtered_doc = filter_fields(doc, keep_fields)
-
-                    # base_schema 적용
-                    unified_doc = apply_base_schema(filtered_doc, base_schema)
-
-                    # 모두 None이면 skip
-                    if is_effectively_empty(unified_doc):
+                    # --fields 필터 + base_schema 적용, 모두 None이면 skip
+                    unified_doc = build_unified_doc(doc, unified_fields)
+                    if unified_doc is None:
                         continue
 
-                    # 카프카 전송
-                    payload = json.dumps(unified_doc, ensure_ascii=False).encode("utf-8")
-                    producer.send(kafka_topic, payload)
+                    # 카프카 전송 (직렬화는 producer의 value_serializer가 처리)
+                    producer.send(kafka_topic, unified_doc)
 
                     # timestamp 갱신
                     if doc_ts and doc_ts > local_max_ts:
                         local_max_ts = doc_ts
-
-                producer.flush()
-
-                if local_max_ts != last_timestamp:
-                    save_checkpoint(checkpoint_file, local_max_ts)
-                    last_timestamp = local_max_ts
-                    print(f"[INFO] Updated checkpoint to {local_max_ts}")
+                
+                # 2) 페이지마다 전송 완료 후 체크포인트 저장
+                #    (중간 페이지에서 ES 오류가 나도 이미 보낸 페이지는 다음 폴링에서 다시 보내지 않음)
+                #    @timestamp가 그대로여도 sort 값(_id)은 바뀌므로 페이지마다 저장
+                if new_docs:
+                    producer.flush()
+                    save_checkpoint(checkpoint_file, local_max_ts, search_after)
+                    last_timestamp, last_sort = local_max_ts, search_after
+                
+                if len(new_docs) < fetch_size:
+                    break
+            
+            if not fetched:
+                print("[INFO] No new FTH documents found.")
+            else:
+                print(f"[INFO] Fetched {fetched} new FTH documents. Checkpoint at {last_timestamp}")
         
+        except CircuitOpen as e:
+            print(f"[WARN] {e}")
         except Exception as e:
             print(f"[ERROR] {e}")
         